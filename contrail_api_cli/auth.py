@@ -1,8 +1,15 @@
+import os
+import json
 import base64
+import hashlib
 from six import b
 
 from oslo_config import cfg
+from keystoneclient.access import AccessInfo
 from keystoneclient.auth.base import BaseAuthPlugin
+from keystoneclient.auth.identity.base import BaseIdentityPlugin
+
+from contrail_api_cli import utils
 
 
 class HTTPAuth(BaseAuthPlugin):
@@ -10,10 +17,13 @@ class HTTPAuth(BaseAuthPlugin):
     def __init__(self, username, password):
         self.username = username
         self.password = password
+        self._headers = None
 
     def get_headers(self, session, **kwargs):
-        auth = "%s:%s" % (self.username, self.password)
-        return {'Authorization': 'Basic %s' % base64.b64encode(b(auth)).decode('utf-8')}
+        if self._headers is None:
+            auth = "%s:%s" % (self.username, self.password)
+            self._headers = {'Authorization': 'Basic %s' % base64.b64encode(b(auth)).decode('utf-8')}
+        return self._headers
 
     @classmethod
     def get_options(cls):
@@ -21,3 +31,84 @@ class HTTPAuth(BaseAuthPlugin):
             cfg.StrOpt('username', help='username for basic HTTP authentication'),
             cfg.StrOpt('password', help='passowrd for basic HTTP authentication')
         ]
+
+
+class TokenCache(object):
+    """
+    Keep keystone tokens on disk between runs.
+
+    Tokens are stored in one file per auth url, user and project,
+    readable only by the current user. Tokens about to expire
+    are not loaded.
+
+    :param directory: Where tokens are stored.
+    """
+    KEY_ATTRS = ('auth_url', 'username', 'user_id', 'user_domain_id',
+                 'user_domain_name', 'tenant_id', 'tenant_name',
+                 'project_id', 'project_name', 'project_domain_id',
+                 'project_domain_name', 'domain_id', 'domain_name',
+                 'trust_id')
+
+    def __init__(self, directory=None):
+        self.directory = directory or utils.get_cache_dir('tokens')
+
+    def _get_filename(self, plugin):
+        # v3 plugins keep the user information in their auth methods
+        sources = [plugin] + list(getattr(plugin, 'auth_methods', []))
+        key = []
+        for attr in self.KEY_ATTRS:
+            for source in sources:
+                value = getattr(source, attr, None)
+                if value is not None:
+                    key.append("%s=%s" % (attr, value))
+                    break
+        digest = hashlib.sha256(b("\n".join(key))).hexdigest()
+        return os.path.join(self.directory, digest)
+
+    def load(self, plugin):
+        """
+        Set the plugin token from the cache if one is still valid
+
+        @rtype: bool
+        """
+        if not isinstance(plugin, BaseIdentityPlugin):
+            return False
+        try:
+            with open(self._get_filename(plugin)) as f:
+                cached = json.load(f)
+            if cached['version'] == 'v3':
+                access = AccessInfo.factory(body={'token': cached['data']},
+                                            auth_token=cached['auth_token'])
+            else:
+                access = AccessInfo.factory(body={'access': cached['data']})
+        except (IOError, OSError, ValueError, KeyError):
+            return False
+        if access.will_expire_soon(stale_duration=plugin.MIN_TOKEN_LIFE_SECONDS):
+            return False
+        plugin.auth_ref = access
+        return True
+
+    def save(self, plugin):
+        """
+        Store the plugin token if it has one. The token is not
+        cached when the cache directory is not writable.
+        """
+        if not isinstance(plugin, BaseIdentityPlugin) or plugin.auth_ref is None:
+            return
+        access = plugin.auth_ref
+        filename = self._get_filename(plugin)
+        tmp = "%s.%s.tmp" % (filename, os.getpid())
+        try:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory, 0o700)
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'version': access.version,
+                           'auth_token': access.auth_token,
+                           'data': dict(access)}, f)
+            os.rename(tmp, filename)
+        except (IOError, OSError):
+            try:
+                os.remove(tmp)
+            except (IOError, OSError):
+                pass
@@ -0,0 +1,119 @@
+import os
+import json
+import hashlib
+from threading import Thread
+
+from six import b
+
+from contrail_api_cli import utils
+
+
+class Catalog(object):
+    """
+    Home resources of an API server, cached on disk.
+
+    The cache is ignored when it was written with another
+    VERSION of the catalog format.
+
+    :param base_url: API server url.
+    :param directory: Where catalogs are stored.
+    """
+    VERSION = 1
+
+    def __init__(self, base_url, directory=None):
+        self.base_url = base_url
+        self.directory = directory or utils.get_cache_dir('catalog')
+        self.resources = None
+        self.resource_types = set()
+
+    @property
+    def filename(self):
+        return os.path.join(self.directory,
+                            hashlib.sha256(b(self.base_url)).hexdigest())
+
+    def _set_resources(self, resources):
+        self.resource_types = set(resources.types)
+        self.resources = resources
+
+    def has_type(self, resource_type):
+        """
+        Return False only if the catalog is loaded and
+        doesn't contain resource_type
+        """
+        if self.resources is None:
+            return True
+        return resource_type in self.resource_types
+
+    def load(self):
+        """
+        Load the catalog from the disk cache
+
+        @rtype: bool
+        """
+        try:
+            with open(self.filename) as f:
+                cached = json.load(f)
+        except (IOError, OSError, ValueError):
+            return False
+        if cached.get('version') != self.VERSION or \
+                cached.get('base_url') != self.base_url:
+            return False
+        self._set_resources(utils.ResourceList(paths=cached['paths'],
+                                               types=cached['types']))
+        return True
+
+    def save(self):
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory, 0o700)
+        tmp = "%s.%s.tmp" % (self.filename, os.getpid())
+        with open(tmp, 'w') as f:
+            json.dump({'version': self.VERSION,
+                       'base_url': self.base_url,
+                       'paths': self.resources.paths,
+                       'types': self.resources.types}, f)
+        os.rename(tmp, self.filename)
+
+    def refresh(self, client):
+        """
+        Fetch the home resources with client and update the cache
+
+        @type client: APIClient
+        """
+        data = client.get_raw(utils.Path("/"))
+        self._set_resources(client._get_home_resources(data))
+        try:
+            self.save()
+        except (IOError, OSError):
+            pass
+
+    def refresh_in_background(self, client, on_done=None):
+        """
+        Refresh the catalog in a thread, on_done is called
+        with the catalog when it is refreshed
+        """
+        def refresh():
+            try:
+                self.refresh(client)
+            except Exception:
+                return
+            if on_done is not None:
+                on_done(self)
+
+        t = Thread(target=refresh)
+        t.daemon = True
+        t.start()
+        return t
+
+
+_catalogs = {}
+
+
+def get(base_url):
+    """
+    Return the catalog of base_url
+
+    @rtype: Catalog
+    """
+    if base_url not in _catalogs:
+        _catalogs[base_url] = Catalog(base_url)
+    return _catalogs[base_url]
@@ -1,11 +1,175 @@
-from contrail_api_cli import utils
+import time
+import json
+import threading
+from functools import partial
+from contextlib import contextmanager
+from concurrent.futures import TimeoutError, Future
 
+from keystoneclient.exceptions import HttpError
 
-class APIClient:
+from contrail_api_cli import utils, catalog
+
+
+_local = threading.local()
+
+
+class Cancelled(Exception):
+
+    def __init__(self, message="Cancelled"):
+        super(Cancelled, self).__init__(message)
+
+
+@contextmanager
+def cancellation(event):
+    """
+    Requests of APIClient instances created in the current thread
+    raise Cancelled as soon as event is set. In flight GETs are
+    abandoned, the server still processes them. Requests changing
+    data (DELETE, POST) are not abandoned once sent so that their
+    outcome is known, the next request raises Cancelled.
+
+    @type event: threading.Event
+    """
+    previous = getattr(_local, 'cancel_event', None)
+    _local.cancel_event = event
+    try:
+        yield event
+    finally:
+        _local.cancel_event = previous
+
+
+def _in_daemon_thread(func):
+    """
+    Run func in a new daemon thread so that the interpreter
+    doesn't wait for it at exit
+
+    @type func: callable
+    @rtype: Future
+    """
+    future = Future()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(func())
+        except Exception as e:
+            future.set_exception(e)
+    thread = threading.Thread(target=run)
+    thread.daemon = True
+    thread.start()
+    return future
+
+
+def parse_resources(data, base_url):
+    """
+    Parse a collection listing into a ResourceList
+
+    @type data: dict
+    @type base_url: str
+    @rtype: ResourceList
+    """
+    resources = utils.ResourceList()
+    start = len(base_url)
+    for collection_name, resource_list in data.items():
+        resources.extend(utils.ResourceList(
+            paths=[r["href"][start:] for r in resource_list],
+            uuids=[r.get("uuid") for r in resource_list],
+            fq_names=[":".join(r.get("fq_name", [])) for r in resource_list],
+            types=[collection_name[:-1]] * len(resource_list)))
+    return resources
+
+
+def _loads(content):
+    # runs in the decode pool, the result only holds
+    # builtin types that are cheap to unpickle
+    return json.loads(content.decode('utf-8'))
+
+
+def _loads_resources(content, base_url):
+    # runs in the decode pool, only the columns
+    # of the ResourceList are sent back
+    return parse_resources(_loads(content), base_url)
+
+
+class SingleFlight(object):
+    """
+    Coalesce concurrent calls made with the same key.
+
+    The first caller runs the function, callers arriving while it
+    is in flight wait for it and get the same result (or exception).
+    requests counts the real calls and saved the calls avoided.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.requests = 0
+        self.saved = 0
+
+    def do(self, key, func):
+        with self.lock:
+            call = self.calls.get(key)
+            if call is not None:
+                self.saved += 1
+                leader = False
+            else:
+                call = self.calls[key] = Future()
+                self.requests += 1
+                leader = True
+        if not leader:
+            return call.result()
+        try:
+            call.set_result(func())
+        except Exception as e:
+            call.set_exception(e)
+        finally:
+            with self.lock:
+                del self.calls[key]
+        return call.result()
+
+
+class APIClient(object):
+    """
+    Client for one contrail API server.
+
+    HOST, PROTOCOL and SESSION class attributes are the defaults used
+    by instances created without arguments. When a client is bound to
+    the current thread (see L{bind}) new instances inherit its settings
+    instead, so that commands run against the bound cluster.
+    """
     USER_AGENT = "contrail-api-cli"
     PROTOCOL = "http"
     HOST = "localhost:8082"
     SESSION = None
+    # shared by all clients so that identical GETs made
+    # at the same time result in one request, None to disable
+    SINGLE_FLIGHT = SingleFlight()
+    # optional ratelimit.TokenBucket and ratelimit.AdaptiveConcurrency
+    # shared by all clients
+    RATE_LIMITER = None
+    CONCURRENCY = None
+    # optional process pool used to decode listings and raw
+    # responses bigger than DECODE_THRESHOLD bytes without
+    # holding the GIL. Responses decoded to Path objects are
+    # not sent to the pool, unpickling the Paths would cost
+    # as much as decoding the response.
+    DECODE_POOL = None
+    DECODE_THRESHOLD = 1024 * 1024
+
+    def __init__(self, host=None, protocol=None, session=None):
+        bound = getattr(_local, 'client', None)
+        if bound is not None:
+            self.HOST = bound.HOST
+            self.PROTOCOL = bound.PROTOCOL
+            self.SESSION = bound.SESSION
+        if host is not None:
+            self.HOST = host
+        if protocol is not None:
+            self.PROTOCOL = protocol
+        if session is not None:
+            self.SESSION = session
+        self.cancel_event = getattr(_local, 'cancel_event', None)
 
     @utils.classproperty
     def base_url(cls):
@@ -15,20 +179,110 @@ class APIClient:
     def user(cls):
         return cls.SESSION.auth.username
 
+    @contextmanager
+    def bind(self):
+        """
+        Make APIClient() instances created in the current thread
+        use this client settings
+        """
+        previous = getattr(_local, 'client', None)
+        _local.client = self
+        try:
+            yield self
+        finally:
+            _local.client = previous
+
     def _get_url(self, path):
         if path.is_absolute():
             return self.base_url + str(path)
         raise ValueError("Path must be absolute")
 
-    def get(self, path, **kwargs):
+    def _request(self, method, url, **kwargs):
+        if self.RATE_LIMITER is not None:
+            self.RATE_LIMITER.acquire()
+        request = getattr(self.SESSION, method)
+        if self.CONCURRENCY is None:
+            return request(url, user_agent=self.USER_AGENT, **kwargs)
+        self.CONCURRENCY.acquire()
+        start = time.time()
+        overloaded = False
+        try:
+            return request(url, user_agent=self.USER_AGENT, **kwargs)
+        except HttpError as e:
+            overloaded = (e.http_status or 0) >= 500
+            raise
+        finally:
+            self.CONCURRENCY.release(time.time() - start, overloaded)
+
+    def _cancellable(self, func, abandon=True):
+        if self.cancel_event is None:
+            return func()
+        if self.cancel_event.is_set():
+            raise Cancelled()
+        if not abandon:
+            return func()
+        # the request keeps running in its own thread after
+        # cancellation but its result is ignored
+        future = _in_daemon_thread(func)
+        while True:
+            try:
+                return future.result(timeout=0.1)
+            except TimeoutError:
+                if self.cancel_event.is_set():
+                    raise Cancelled()
+
+    def _use_decode_pool(self, r):
+        return self.DECODE_POOL is not None and \
+            len(r.content) > self.DECODE_THRESHOLD
+
+    def _decode(self, r):
+        return r.json(object_hook=partial(utils.decode_paths,
+                                          base_url=self.base_url))
+
+    def _get(self, path, params):
         url = self._get_url(path)
         if path.is_collection:
             url += 's'
-        r = self.SESSION.get(url, user_agent=self.USER_AGENT, params=kwargs)
-        return r.json(object_hook=utils.decode_paths)
+        if self.SINGLE_FLIGHT is None:
+            return self._cancellable(
+                lambda: self._request("get", url, params=params))
+        key = (id(self.SESSION), url, tuple(sorted(params.items())))
+        # The response is shared, each caller decodes
+        # its own copy of the data
+        return self._cancellable(lambda: self.SINGLE_FLIGHT.do(
+            key,
+            lambda: self._request("get", url, params=params)))
+
+    def get(self, path, **kwargs):
+        return self._decode(self._get(path, kwargs))
+
+    def get_raw(self, path, **kwargs):
+        """
+        Like get() but hrefs are not decoded to Path objects and
+        keep their full url
+        """
+        r = self._get(path, kwargs)
+        if self._use_decode_pool(r):
+            return self.DECODE_POOL.submit(_loads, r.content).result()
+        return r.json()
+
+    def get_resources(self, path):
+        """
+        GET the collection path as a ResourceList
+
+        @type path: Path
+        @rtype: ResourceList
+        """
+        r = self._get(path, {})
+        if self._use_decode_pool(r):
+            return self.DECODE_POOL.submit(_loads_resources, r.content,
+                                           self.base_url).result()
+        return self._get_resources(r.json())
 
     def delete(self, path):
-        self.SESSION.delete(self._get_url(path), user_agent=self.USER_AGENT)
+        url = self._get_url(path)
+        self._cancellable(lambda: self._request("delete", url),
+                          abandon=False)
         return True
 
     def post(self, path, data):
@@ -40,9 +294,12 @@ class APIClient:
         @rtype: dict
         """
         headers = {"content-type": "application/json"}
-        r = self.SESSION.post(self._get_url(path), data=utils.to_json(data),
-                              headers=headers, user_agent=self.USER_AGENT)
-        return r.json(object_hook=utils.decode_paths)
+        url = self._get_url(path)
+        r = self._cancellable(lambda: self._request("post", url,
+                                                    data=utils.to_json(data),
+                                                    headers=headers),
+                              abandon=False)
+        return self._decode(r)
 
     def fqname_to_id(self, path, fq_name):
         """
@@ -60,24 +317,63 @@ class APIClient:
         return utils.Path(path, uuid)
 
     def list(self, path):
-        data = self.get(path)
+        """
+        List resources of path. Root and collection listings
+        are returned as a ResourceList. The root listing comes
+        from the catalog when it is loaded.
+
+        @type path: Path
+        @rtype: ResourceList or dict
+        """
         if path.is_root:
-            return self._get_home_resources(data)
+            resources = catalog.get(self.base_url).resources
+            if resources is not None:
+                return resources
+            return self._get_home_resources(self.get_raw(path))
         elif path.is_collection:
-            return self._get_resources(data)
+            return self.get_resources(path)
         elif path.is_resource:
-            return data[path.resource_name]
+            return self.get(path)[path.resource_name]
 
     def _get_resources(self, data):
-        resources = []
-        for resource_name, resource_list in data.items():
-            for resource in resource_list:
-                resources.append(resource["href"])
-        return resources
+        return parse_resources(data, self.base_url)
 
     def _get_home_resources(self, data):
-        resources = []
-        for resource in data['links']:
-            if resource["link"]["rel"] == "resource-base":
-                resources.append(resource["link"]["href"])
-        return resources
+        start = len(self.base_url)
+        links = [r["link"] for r in data['links']
+                 if r["link"]["rel"] == "resource-base"]
+        return utils.ResourceList(paths=[link["href"][start:] for link in links],
+                                  types=[link["name"] for link in links])
+
+
+def fan_out(clients, func, timeout=None):
+    """
+    Call func concurrently with each client bound to the worker thread.
+
+    Each cluster gets its own timeout so that one slow cluster doesn't
+    delay the results of the others. Returns a list of
+    (client, result, exception) tuples in the order of clients. On
+    timeout the exception is a concurrent.futures.TimeoutError, the
+    worker is a daemon thread and is abandoned.
+
+    @type clients: [APIClient]
+    @type func: callable
+    @type timeout: float
+    @rtype: [(APIClient, object, Exception)]
+    """
+    def call(client):
+        with client.bind():
+            return func()
+
+    start = time.time()
+    futures = [(c, _in_daemon_thread(partial(call, c))) for c in clients]
+    results = []
+    for client, future in futures:
+        remaining = None
+        if timeout is not None:
+            remaining = max(timeout - (time.time() - start), 0)
+        try:
+            results.append((client, future.result(timeout=remaining), None))
+        except Exception as e:
+            results.append((client, None, e))
+    return results
@@ -1,22 +1,110 @@
+import os
+import re
+import math
+import time
+import random
+import bisect
+import fnmatch
 import inspect
+import threading
 import argparse
 import json
+import types
+import hashlib
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
 
-from keystoneclient.exceptions import HttpError
+from six import b, string_types
+from keystoneclient.exceptions import HttpError, ConnectionRefused, ClientException
 
-from pygments import highlight
-from pygments.lexers import JsonLexer
-from pygments.formatters import Terminal256Formatter
-
-from contrail_api_cli import utils
+from contrail_api_cli import utils, catalog, render
+from contrail_api_cli.jobs import manager, set_progress, confirm
 from contrail_api_cli.utils import ShellContext
-from contrail_api_cli.client import APIClient
+from contrail_api_cli.client import APIClient, Cancelled
 
 
 class CommandError(Exception):
     pass
 
 
+def check_resource_type(path):
+    """
+    Check the resource type of path against the catalog
+    of the API server so that typos don't need a request
+    """
+    if path.resource_name and \
+            not catalog.get(APIClient().base_url).has_type(path.resource_name):
+        raise CommandError('Unknown resource type "%s"' % path.resource_name)
+    return path
+
+
+def get_parallel(parallel, client):
+    """
+    Return the number of concurrent requests of a command.
+
+    When the adaptive concurrency is enabled its max limit is used
+    by default so that it throttles requests instead of -p.
+    """
+    if parallel is not None:
+        return parallel
+    if client.CONCURRENCY is not None:
+        return client.CONCURRENCY.max_limit
+    return 4
+
+
+def _match(listing, column, pattern):
+    regex = re.compile(fnmatch.translate(pattern))
+    return [listing[idx] for idx, value in enumerate(column)
+            if regex.match(value)]
+
+
+def expand_paths(resources, client):
+    """
+    Return the paths of resources.
+
+    Resources are paths or fq_names relative to the current path
+    and can contain shell-style wildcards. Wildcards are matched
+    against the listing of the parent collection, or of the current
+    collection for fq_names. Each listing is fetched once.
+
+    @type resources: str or [str]
+    @type client: APIClient
+    @rtype: [Path]
+    """
+    if isinstance(resources, string_types):
+        resources = [resources]
+    listings = {}
+
+    def get_listing(path):
+        if not (path.is_root or path.is_collection):
+            raise CommandError('Wildcards can only match resources of a collection.')
+        if path not in listings:
+            listings[path] = client.list(path)
+        return listings[path]
+
+    paths = []
+    for resource in resources or ['']:
+        is_glob = any(c in resource for c in "*?[")
+        if ":" in resource and is_glob:
+            if not ShellContext.current_path.resource_name:
+                raise CommandError('fq_name wildcards need a collection as current path.')
+            listing = get_listing(utils.Path("/", ShellContext.current_path.resource_name))
+            matches = _match(listing, listing.fq_names, resource)
+        elif ":" in resource:
+            target = client.fqname_to_id(ShellContext.current_path, resource)
+            matches = [target] if target is not None else []
+        elif is_glob:
+            pattern = ShellContext.current_path / resource
+            listing = get_listing(check_resource_type(pattern.parent))
+            matches = _match(listing, listing.paths, str(pattern))
+        else:
+            matches = [check_resource_type(ShellContext.current_path / resource)]
+        if not matches:
+            print("Can't find %s" % resource)
+        paths += matches
+    return paths
+
+
 class ArgumentParser(argparse.ArgumentParser):
 
     def exit(self, status=0, message=None):
@@ -84,7 +172,15 @@ class ShellCommand(BaseCommand):
 
 class Ls(Command):
     description = "List resource objects"
-    resource = Arg(nargs="?", help="Resource path", default="")
+    resource = Arg(nargs="*", default=[],
+                   help="Resource paths or fq_names, wildcards are allowed")
+    output_format = Arg("-o", "--format", dest="output_format",
+                        choices=render.FORMATS, default=None,
+                        help="Output format (default: json for resources, "
+                             "paths for collections)")
+    parallel = Arg("-p", "--parallel", dest="parallel", type=int, default=None,
+                   help="Number of concurrent requests (default=4, or the "
+                        "--max-concurrency limit)")
 
     def walk_resource(self, data):
         data = self.transform_resource(data)
@@ -108,54 +204,103 @@ class Ls(Command):
         return data
 
     def colorize(self, data):
-        json_data = json.dumps(data, sort_keys=True, indent=2,
-                               cls=utils.PathEncoder,
-                               separators=(',', ': '))
-        return highlight(json_data,
-                         JsonLexer(indent=2),
-                         Terminal256Formatter(bg="dark"))
+        return render.colorize(render.to_json(data), 'json')
 
-    def __call__(self, resource=''):
-        # Find Path from fq_name
-        if ":" in resource:
-            target = APIClient().fqname_to_id(ShellContext.current_path, resource)
-            if target is None:
-                print("Can't find %s" % resource)
-                return
-        else:
-            target = ShellContext.current_path / resource
-        data = APIClient().list(target)
+    def _list(self, client, target, output_format=None):
+        data = client.list(target)
         if target.is_resource:
             data = self.walk_resource(data)
-            return self.colorize(data)
+            if output_format is None:
+                return self.colorize(data)
+            try:
+                return render.render(data, output_format)
+            except ValueError as e:
+                raise CommandError(str(e))
+        elif output_format is not None:
+            ShellContext.completion_queue.put(data)
+            try:
+                return render.render_resources(data, ShellContext.current_path,
+                                               output_format)
+            except ValueError as e:
+                raise CommandError(str(e))
         else:
             return data
 
+    def __call__(self, resource='', parallel=None, output_format=None):
+        client = APIClient()
+        parallel = get_parallel(parallel, client)
+        targets = expand_paths(resource, client)
+        if not targets:
+            return
+        if len(targets) == 1:
+            return self._list(client, targets[0], output_format)
+        output = []
+        for result in utils.parallel_map(partial(self._list, client,
+                                                 output_format=output_format),
+                                         targets, workers=parallel):
+            if isinstance(result, utils.ResourceList):
+                ShellContext.completion_queue.put(result)
+                result = "\n".join(result.relative_to(ShellContext.current_path))
+            elif isinstance(result, types.GeneratorType):
+                result = "\n".join(result)
+            output.append(result)
+        return "\n".join(output)
+
 
 class Count(Command):
     description = "Count number of resources"
-    resource = Arg(nargs="?", help="Resource path", default='')
+    resource = Arg(nargs="*", default=[],
+                   help="Collection paths, wildcards are allowed")
+    parallel = Arg("-p", "--parallel", dest="parallel", type=int, default=None,
+                   help="Number of concurrent requests (default=4, or the "
+                        "--max-concurrency limit)")
 
-    def __call__(self, resource=''):
-        target = ShellContext.current_path / resource
+    def _count(self, client, target):
         if target.is_collection:
-            data = APIClient().get(target, count=True)
+            data = client.get(target, count=True)
             return data[target.resource_name + "s"]["count"]
 
+    def __call__(self, resource='', parallel=None):
+        client = APIClient()
+        parallel = get_parallel(parallel, client)
+        targets = expand_paths(resource, client)
+        if len(targets) == 1:
+            return self._count(client, targets[0])
+        counts = utils.parallel_map(partial(self._count, client),
+                                    targets, workers=parallel)
+        return "\n".join(["%s: %s" % (t.relative_to(ShellContext.current_path), c)
+                          for t, c in zip(targets, counts)
+                          if c is not None]) or None
+
 
 @experimental
 class Rm(Command):
-    description = "Delete a resource"
-    resource = Arg(nargs="?", help="Resource path", default='')
+    description = "Delete resources"
+    resource = Arg(nargs="*", default=[],
+                   help="Resource paths or fq_names, wildcards are allowed")
+    parallel = Arg("-p", "--parallel", dest="parallel", type=int, default=None,
+                   help="Number of concurrent requests (default=4, or the "
+                        "--max-concurrency limit)")
     recursive = Arg("-r", "--recursive", dest="recursive",
                     action="store_true", default=False,
                     help="Recursive delete of back_refs resources")
     force = Arg("-f", "--force", dest="force",
                 action="store_true", default=False,
                 help="Don't ask for confirmation")
-
-    def _get_back_refs(self, path, back_refs):
-        resource = APIClient().get(path)[path.resource_name]
+    resume = Arg("--resume", dest="resume",
+                 action="store_true", default=False,
+                 help="Resume an interrupted recursive delete")
+    retries = 3
+    retry_delay = 1
+
+    def _get_back_refs(self, client, path, back_refs, resources=None):
+        # resources already fetched, shared back_refs are
+        # fetched only once
+        if resources is None:
+            resources = {}
+        if path not in resources:
+            resources[path] = client.get(path)[path.resource_name]
+        resource = resources[path]
         if resource["href"] in back_refs:
             back_refs.remove(resource["href"])
         back_refs.append(resource["href"])
@@ -163,28 +308,406 @@ class Rm(Command):
             if not attr.endswith("back_refs"):
                 continue
             for back_ref in values:
-                back_refs = self._get_back_refs(back_ref["href"],
-                                                back_refs)
+                back_refs = self._get_back_refs(client, back_ref["href"],
+                                                back_refs, resources)
         return back_refs
 
-    def __call__(self, resource='', recursive=False, force=False):
-        target = ShellContext.current_path / resource
-        if not target.is_resource:
-            raise CommandError('"%s" is not a resource.' % target.relative_to(ShellContext.current_path))
+    def _get_all_back_refs(self, client, targets, parallel):
+        # back_refs of each target are discovered concurrently, then
+        # merged so that back_refs are still deleted before their refs
+        resources = {}
+        back_refs = []
+        for target_back_refs in utils.parallel_map(
+                lambda t: self._get_back_refs(client, t, [], resources),
+                targets, workers=parallel):
+            for ref in target_back_refs:
+                if ref in back_refs:
+                    back_refs.remove(ref)
+                back_refs.append(ref)
+        return back_refs
 
-        back_refs = [target]
-        if recursive:
-            back_refs = self._get_back_refs(target, [])
+    def _get_journal(self, client, resources):
+        # keyed on the arguments as typed, the paths they expand
+        # to change once some of the resources are deleted
+        key = "\n".join([client.base_url, str(ShellContext.current_path)] +
+                        sorted(resources or ['']))
+        return utils.Journal(os.path.join(utils.get_cache_dir('journal'),
+                                          hashlib.sha256(b(key)).hexdigest()))
+
+    def _delete(self, client, path):
+        """
+        Delete path, retrying on server and connection errors.
+        Resources already deleted are ignored.
+        """
+        print("Deleting %s" % str(path))
+        for attempt in range(self.retries + 1):
+            try:
+                client.delete(path)
+                return path
+            except HttpError as e:
+                if e.http_status == 404:
+                    return path
+                if attempt == self.retries or \
+                        (e.http_status or 0) < 500 and e.http_status != 408:
+                    raise
+            except ConnectionRefused:
+                if attempt == self.retries:
+                    raise
+            time.sleep(self.retry_delay * 2 ** attempt)
+
+    def __call__(self, resource='', recursive=False, force=False,
+                 resume=False, parallel=None):
+        client = APIClient()
+        parallel = get_parallel(parallel, client)
+        if isinstance(resource, string_types):
+            resource = [resource]
+        journal = None
+        if resume:
+            # the journal plan is used as is, resources
+            # are not expanded again
+            journal = self._get_journal(client, resource)
+            loaded = journal.load()
+            if loaded is None:
+                raise CommandError('No interrupted delete of "%s" to resume.' % " ".join(resource))
+            plan, done = loaded
+            back_refs = [utils.Path(p) for p in reversed(plan) if p not in done]
+        else:
+            targets = expand_paths(resource, client)
+            for target in targets:
+                if not target.is_resource:
+                    raise CommandError('"%s" is not a resource.' % target.relative_to(ShellContext.current_path))
+            if not targets:
+                return
+            if recursive:
+                journal = self._get_journal(client, resource)
+                back_refs = self._get_all_back_refs(client, targets, parallel)
+            else:
+                back_refs = targets
         if back_refs:
             message = """About to delete:
  - %s""" % "\n - ".join([str(p.relative_to(ShellContext.current_path)) for p in back_refs])
-            if force or utils.continue_prompt(message=message):
-                for ref in reversed(back_refs):
-                    print("Deleting %s" % str(ref))
-                    try:
-                        APIClient().delete(ref)
-                    except HttpError as e:
-                        raise CommandError("Failed to delete resource: %s" % str(e))
+            if force or confirm(message):
+                if journal is not None and not resume:
+                    journal.start([str(p) for p in reversed(back_refs)])
+                if journal is None:
+                    # independent resources can be deleted concurrently
+                    deleted = utils.parallel_map(partial(self._delete, client),
+                                                 back_refs, workers=parallel)
+                else:
+                    deleted = (self._delete(client, ref)
+                               for ref in reversed(back_refs))
+                try:
+                    for idx, ref in enumerate(deleted):
+                        set_progress("%d/%d deleted" % (idx + 1, len(back_refs)))
+                        if journal is not None:
+                            journal.done(str(ref))
+                except (HttpError, ConnectionRefused) as e:
+                    message = "Failed to delete resource: %s" % str(e)
+                    if journal is not None:
+                        message += ". Run again with --resume to continue."
+                    raise CommandError(message)
+                if journal is not None:
+                    journal.remove()
+        elif resume:
+            journal.remove()
+
+
+class Export(Command):
+    description = "Export resources of a collection as json lines"
+    resource = Arg(nargs="?", help="Collection path", default='')
+    output = Arg("-o", "--output", dest="output", required=True,
+                 help="Output file")
+    compress = Arg("-z", "--gzip", dest="compress",
+                   action="store_true", default=False,
+                   help="Compress output with gzip (default if output ends with .gz)")
+    parallel = Arg("-p", "--parallel", dest="parallel", type=int, default=None,
+                   help="Number of concurrent requests (default=4, or the "
+                        "--max-concurrency limit)")
+    batch_size = Arg("-b", "--batch-size", dest="batch_size", type=int,
+                     default=50,
+                     help="Number of resources fetched by request (default=%(default)s)")
+
+    def _get_details(self, client, target, uuids):
+        data = client.get_raw(target, detail=True, obj_uuids=",".join(uuids))
+        return [r[target.resource_name]
+                for r in data[target.resource_name + "s"]]
+
+    def __call__(self, resource='', output=None, compress=False,
+                 parallel=None, batch_size=50):
+        target = check_resource_type(ShellContext.current_path / resource)
+        if not target.is_collection:
+            raise CommandError('"%s" is not a collection.' % target.relative_to(ShellContext.current_path))
+        client = APIClient()
+        parallel = get_parallel(parallel, client)
+        uuids = [r["uuid"]
+                 for r in client.get_raw(target)[target.resource_name + "s"]]
+        batches = utils.parallel_map(partial(self._get_details, client, target),
+                                     utils.chunks(uuids, batch_size),
+                                     workers=parallel)
+        count = 0
+        with utils.open_file(output, "wb", compress) as f:
+            for resources in batches:
+                for r in resources:
+                    line = json.dumps({target.resource_name: r},
+                                      sort_keys=True, separators=(',', ':'))
+                    f.write(line.encode('utf-8') + b"\n")
+                    count += 1
+                set_progress("%d/%d exported" % (count, len(uuids)))
+        return "Exported %d resources to %s" % (count, output)
+
+
+class Import(Command):
+    name = "import"
+    description = "Create resources from a file made with export"
+    filename = Arg(help="File to import")
+    compress = Arg("-z", "--gzip", dest="compress",
+                   action="store_true", default=False,
+                   help="Input is compressed with gzip (default if filename ends with .gz)")
+    parallel = Arg("-p", "--parallel", dest="parallel", type=int, default=None,
+                   help="Number of concurrent requests (default=4, or the "
+                        "--max-concurrency limit)")
+
+    def clean_resource(self, data):
+        """
+        Remove hrefs, back_refs and children that can't be
+        provided when creating a resource
+        """
+        for attr, value in list(data.items()):
+            if attr in ("href", "parent_href") or attr.endswith("back_refs"):
+                del data[attr]
+            elif attr.endswith("_refs"):
+                for ref in value:
+                    ref.pop("href", None)
+            elif (type(value) is list and value and
+                    type(value[0]) is dict and "href" in value[0]):
+                del data[attr]
+        return data
+
+    def _create(self, client, line):
+        resource_name, resource = json.loads(line.decode('utf-8')).popitem()
+        resource = self.clean_resource(resource)
+        try:
+            client.post(utils.Path("/" + resource_name + "s"),
+                        {resource_name: resource})
+        except HttpError as e:
+            return "Failed to import %s %s: %s" % (resource_name,
+                                                   resource.get("uuid"),
+                                                   str(e))
+
+    def __call__(self, filename=None, compress=False, parallel=None):
+        client = APIClient()
+        parallel = get_parallel(parallel, client)
+        imported = failed = 0
+        with utils.open_file(filename, "rb", compress) as f:
+            lines = (line for line in f if line.strip())
+            for error in utils.parallel_map(partial(self._create, client),
+                                            lines, workers=parallel):
+                if error is None:
+                    imported += 1
+                else:
+                    print(error)
+                    failed += 1
+                set_progress("%d imported, %d failures" % (imported, failed))
+        return "Imported %d resources, %d failures" % (imported, failed)
+
+
+class BenchStats(object):
+    """
+    Latencies and errors of the requests made by bench
+    """
+
+    def __init__(self, max_requests=None):
+        self.max_requests = max_requests
+        self.started = 0
+        self.latencies = {}
+        self.errors = {}
+        # lowest limit of the adaptive concurrency seen
+        self.concurrency = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        """
+        Return False when max_requests are already started
+        """
+        with self.lock:
+            if self.max_requests is not None and \
+                    self.started >= self.max_requests:
+                return False
+            self.started += 1
+            return True
+
+    def record(self, endpoint, latency, error=False):
+        with self.lock:
+            self.latencies.setdefault(endpoint, []).append(latency)
+            self.errors.setdefault(endpoint, 0)
+            if error:
+                self.errors[endpoint] += 1
+
+    def record_concurrency(self, limit):
+        with self.lock:
+            if self.concurrency is None or limit < self.concurrency:
+                self.concurrency = limit
+
+    @staticmethod
+    def percentile(latencies, p):
+        idx = int(math.ceil(p / 100.0 * len(latencies))) - 1
+        return latencies[max(idx, 0)]
+
+    def report(self, duration):
+        lines = ["%-8s %9s %7s %7s %9s %9s %9s %9s" % (
+            "endpoint", "requests", "errors", "err%", "req/s",
+            "p50(ms)", "p95(ms)", "p99(ms)")]
+        rows = [(e, self.latencies[e], self.errors[e])
+                for e in sorted(self.latencies)]
+        rows.append(("total",
+                     [latency for _, latencies, _ in rows for latency in latencies],
+                     sum([errors for _, _, errors in rows])))
+        for endpoint, latencies, errors in rows:
+            if not latencies:
+                continue
+            latencies = sorted(latencies)
+            lines.append("%-8s %9d %7d %7.1f %9.1f %9.1f %9.1f %9.1f" % (
+                endpoint, len(latencies), errors,
+                100.0 * errors / len(latencies),
+                len(latencies) / duration,
+                self.percentile(latencies, 50) * 1000,
+                self.percentile(latencies, 95) * 1000,
+                self.percentile(latencies, 99) * 1000))
+        return "\n".join(lines)
+
+
+class Bench(Command):
+    description = "Load test the API server with a mix of read requests"
+    resource = Arg(nargs="*", default=[],
+                   help="Collections used by requests, wildcards are allowed (default: all)")
+    workers = Arg("-w", "--workers", dest="workers", type=int, default=4,
+                  help="Number of concurrent workers (default=%(default)s)")
+    duration = Arg("-d", "--duration", dest="duration", type=float,
+                   default=None,
+                   help="Duration of the test in seconds (default=10 "
+                        "unless --requests is given)")
+    requests = Arg("-n", "--requests", dest="requests", type=int,
+                   default=None,
+                   help="Stop after this number of requests")
+    mix = Arg("-m", "--mix", dest="mix", default="list:1,get:4,fqname:1,count:1",
+              help="Weights of collection listings, detail gets, fq_name "
+                   "resolutions and counts (default=%(default)s)")
+    endpoints = ("list", "get", "fqname", "count")
+
+    def _parse_mix(self, mix):
+        weights = {}
+        for item in mix.split(","):
+            endpoint, _, weight = item.partition(":")
+            if endpoint not in self.endpoints:
+                raise CommandError('Unknown endpoint "%s"' % endpoint)
+            try:
+                weights[endpoint] = float(weight or 1)
+            except ValueError:
+                raise CommandError('Bad weight "%s"' % weight)
+        return weights
+
+    def _call(self, client, endpoint, rng, collections, resources):
+        if endpoint in ("get", "fqname"):
+            collection, listing = rng.choice(resources)
+            idx = rng.randrange(len(listing))
+            if endpoint == "get":
+                client.get_raw(listing[idx])
+            else:
+                client.fqname_to_id(collection, listing.fq_names[idx])
+        else:
+            collection, listing = rng.choice(collections)
+            if endpoint == "list":
+                client.get_raw(collection)
+            else:
+                client.get_raw(collection, count=True)
+
+    def _worker(self, client, weights, collections, resources, deadline,
+                stats, stop, cancel_event=None):
+        rng = random.Random()
+        endpoints = sorted(weights)
+        cumulative = []
+        total = 0
+        for endpoint in endpoints:
+            total += weights[endpoint]
+            cumulative.append(total)
+        while not stop.is_set() and \
+                (deadline is None or time.time() < deadline) and \
+                stats.start():
+            if cancel_event is not None and cancel_event.is_set():
+                raise Cancelled()
+            endpoint = endpoints[bisect.bisect(cumulative, rng.random() * total)]
+            start = time.time()
+            error = False
+            try:
+                self._call(client, endpoint, rng, collections, resources)
+            except ClientException:
+                error = True
+            stats.record(endpoint, time.time() - start, error)
+            if client.CONCURRENCY is not None:
+                stats.record_concurrency(int(client.CONCURRENCY.limit))
+            set_progress("%d requests" % stats.started)
+
+    def __call__(self, resource='', workers=4, duration=None, requests=None,
+                 mix="list:1,get:4,fqname:1,count:1"):
+        weights = self._parse_mix(mix)
+        client = APIClient()
+        # measure the server, not the coalescing of requests
+        client.SINGLE_FLIGHT = None
+        if resource:
+            targets = expand_paths(resource, client)
+        else:
+            targets = list(client.list(utils.Path("/")))
+        collections = [(t, client.list(t)) for t in targets
+                       if t.is_collection]
+        if not collections:
+            raise CommandError("No collection to use.")
+        resources = [(c, listing) for c, listing in collections if len(listing)]
+        if not resources:
+            weights.pop("get", None)
+            weights.pop("fqname", None)
+        weights = dict([(e, w) for e, w in weights.items() if w > 0])
+        if not weights:
+            raise CommandError("No request to make.")
+
+        # requests are made directly by the workers, cancellation
+        # is checked between requests
+        cancel_event = client.cancel_event
+        client.cancel_event = None
+        stats = BenchStats(requests)
+        if duration is None and requests is None:
+            duration = 10
+        start = time.time()
+        deadline = start + duration if duration is not None else None
+        # set when the bench ends early (Ctrl-C, failed worker)
+        # so that the other workers stop too
+        stop = threading.Event()
+        pool = ThreadPoolExecutor(max_workers=workers)
+        try:
+            futures = [pool.submit(self._worker, client, weights, collections,
+                                   resources, deadline, stats, stop,
+                                   cancel_event)
+                       for i in range(workers)]
+            # a timeout so that Ctrl-C can interrupt us, the
+            # first failed worker ends the bench
+            while futures:
+                done, futures = wait(futures, timeout=0.1,
+                                     return_when=FIRST_EXCEPTION)
+                for future in done:
+                    future.result()
+        finally:
+            stop.set()
+            pool.shutdown(wait=False)
+        elapsed = time.time() - start
+        report = [stats.report(elapsed)]
+        # latencies include the time spent waiting for the limits
+        if client.RATE_LIMITER is not None and \
+                stats.started >= 0.9 * client.RATE_LIMITER.rate * elapsed:
+            report.append("Throttled by --rate-limit (%g req/s)" %
+                          client.RATE_LIMITER.rate)
+        if stats.concurrency is not None and stats.concurrency < workers:
+            report.append("Throttled by --max-concurrency (down to %d concurrent requests for %d workers)" %
+                          (stats.concurrency, workers))
+        return "\n".join(report)
 
 
 class Cd(ShellCommand):
@@ -192,7 +715,7 @@ class Cd(ShellCommand):
     resource = Arg(nargs="?", help="Resource path", default='')
 
     def __call__(self, resource=''):
-        ShellContext.current_path = ShellContext.current_path / resource
+        ShellContext.current_path = check_resource_type(ShellContext.current_path / resource)
 
 
 class Exit(ShellCommand):
@@ -202,6 +725,41 @@ class Exit(ShellCommand):
         raise EOFError
 
 
+class Jobs(ShellCommand):
+    description = "List background jobs"
+
+    def __call__(self):
+        return "\n".join(["[%d] %-10s %s %s" % (j.id, j.status, j.action, j.progress)
+                          for j in manager.list()]) or None
+
+
+class Fg(ShellCommand):
+    description = "Wait for a job in the foreground"
+    job = Arg(nargs="?", type=int, help="Job id (default: last background job)",
+              default=None)
+
+    def __call__(self, job=None):
+        try:
+            job = manager.get(job)
+        except KeyError:
+            raise CommandError("No such job")
+        return manager.wait(job)
+
+
+class Kill(ShellCommand):
+    description = "Cancel a job. Requests already sent are not aborted: " \
+                  "the job stops waiting for a GET but a DELETE or POST " \
+                  "is completed before the job stops"
+    job = Arg(type=int, help="Job id")
+
+    def __call__(self, job=None):
+        try:
+            job = manager.get(job)
+        except KeyError:
+            raise CommandError("No such job")
+        job.cancel()
+
+
 class Help(ShellCommand):
 
     def __call__(self):
@@ -225,4 +783,11 @@ cd = Cd()
 help = Help()
 count = Count()
 rm = Rm()
+export = Export()
+bench = Bench()
+# import is a keyword
+import_ = globals()["import"] = Import()
 exit = Exit()
+jobs = Jobs()
+fg = Fg()
+kill = Kill()
@@ -0,0 +1,240 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import TimeoutError, Future
+
+from contrail_api_cli.client import Cancelled, cancellation
+from contrail_api_cli import utils
+
+
+_local = threading.local()
+
+
+def set_progress(progress):
+    """
+    Report the progress of the job running in the current thread
+
+    @type progress: str
+    """
+    job = getattr(_local, 'job', None)
+    if job is not None:
+        job.progress = progress
+
+
+def confirm(message):
+    """
+    Ask for confirmation on the main thread.
+
+    When called from a job the question is asked by the thread
+    waiting for the job (see L{Job.result}), a background job
+    waits until it is put in the foreground with fg.
+
+    @type message: str
+    @rtype: bool
+    """
+    job = getattr(_local, 'job', None)
+    if job is None:
+        return utils.continue_prompt(message=message)
+    answer = Future()
+    progress = job.progress
+    job.progress = "waiting for confirmation (fg %s)" % job.id
+    job.question = (message, answer)
+    try:
+        while True:
+            try:
+                return answer.result(timeout=0.1)
+            except TimeoutError:
+                if job.cancel_event.is_set():
+                    raise Cancelled()
+    finally:
+        job.question = None
+        job.progress = progress
+
+
+class Job(object):
+    """
+    Command running in its own thread.
+
+    Requests made by the command stop when the job is cancelled,
+    requests already sent may still succeed on the server (see
+    client.cancellation).
+    """
+
+    def __init__(self, id, action, func, background=False):
+        self.id = id
+        self.action = action
+        self.func = func
+        self.background = background
+        self.progress = ''
+        self.cancel_event = threading.Event()
+        self.future = Future()
+        # (message, Future) set by confirm()
+        self.question = None
+
+    def run(self):
+        _local.job = self
+        try:
+            with cancellation(self.cancel_event):
+                return self.func()
+        finally:
+            _local.job = None
+
+    def start(self):
+        """
+        Run the job in a daemon thread, its result is set on future
+        """
+        def target():
+            if not self.future.set_running_or_notify_cancel():
+                return
+            try:
+                self.future.set_result(self.run())
+            except BaseException as e:
+                self.future.set_exception(e)
+        thread = threading.Thread(target=target)
+        thread.daemon = True
+        thread.start()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    @property
+    def done(self):
+        return self.future.done()
+
+    @property
+    def status(self):
+        if not self.future.done():
+            if self.cancel_event.is_set():
+                return "Cancelling"
+            if self.question is not None:
+                return "Waiting"
+            if not self.future.running():
+                return "Queued"
+            return "Running"
+        if self.cancel_event.is_set():
+            return "Cancelled"
+        if self.future.exception() is not None:
+            return "Failed"
+        return "Done"
+
+    def _answer(self):
+        question = self.question
+        if question is None or self.cancel_event.is_set():
+            return
+        message, answer = question
+        if not answer.done():
+            answer.set_result(utils.continue_prompt(message=message))
+
+    def result(self):
+        """
+        Wait for the job and return its result. Questions
+        of the job are asked in the calling thread.
+        """
+        # wait with a timeout so that Ctrl-C can interrupt us
+        while True:
+            self._answer()
+            try:
+                return self.future.result(timeout=0.1)
+            except TimeoutError:
+                continue
+
+
+class JobManager(object):
+    """
+    Run commands in their own thread so that a foreground command
+    never waits for background ones.
+
+    Only background jobs are registered and get an id, they are
+    forgotten once finished so that their results are not kept.
+    """
+
+    def __init__(self):
+        self.jobs = OrderedDict()
+        self.next_id = 1
+        self.lock = threading.Lock()
+
+    def _register(self, job):
+        with self.lock:
+            if job.id is None:
+                job.id = self.next_id
+                self.next_id += 1
+            self.jobs[job.id] = job
+
+    def _forget(self, job):
+        with self.lock:
+            self.jobs.pop(job.id, None)
+
+    def _done(self, job, on_done):
+        if on_done is not None:
+            on_done(job)
+        if job.background:
+            self._forget(job)
+
+    def submit(self, action, func, background=False, on_done=None):
+        """
+        Run func in a new thread
+
+        @param action: command line of the job
+        @param on_done: called with the job when it is finished
+        @rtype: Job
+        """
+        job = Job(None, action, func, background=background)
+        if background:
+            self._register(job)
+        job.future.add_done_callback(lambda f: self._done(job, on_done))
+        job.start()
+        return job
+
+    def get(self, id=None):
+        """
+        Return background job id or the last background job
+
+        @raises KeyError: no such job
+        """
+        with self.lock:
+            if id is None:
+                jobs = [j for j in self.jobs.values() if j.background]
+                if not jobs:
+                    raise KeyError(id)
+                return jobs[-1]
+            return self.jobs[id]
+
+    def list(self):
+        """
+        Return background jobs
+        """
+        with self.lock:
+            return list(self.jobs.values())
+
+    def running(self):
+        with self.lock:
+            return [j for j in self.jobs.values() if not j.done]
+
+    def wait(self, job):
+        """
+        Wait for the job result in the foreground.
+
+        Ctrl-C cancels the job, a second Ctrl-C leaves it
+        running in the background.
+        """
+        job.background = False
+        try:
+            try:
+                return job.result()
+            except KeyboardInterrupt:
+                job.cancel()
+                print("Cancelling %s (Ctrl-C again to leave it in background)" % job.action)
+            return job.result()
+        except KeyboardInterrupt:
+            job.background = True
+            self._register(job)
+            print("[%d] %s" % (job.id, job.action))
+        finally:
+            if not job.background or job.done:
+                self._forget(job)
+
+    def cancel_all(self):
+        for job in self.running():
+            job.cancel()
+
+
+manager = JobManager()
@@ -1,6 +1,8 @@
 import sys
-import pprint
+import types
+import atexit
 import argparse
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
 
 from prompt_toolkit import prompt
 from prompt_toolkit.history import InMemoryHistory
@@ -10,14 +12,16 @@ from pygments.token import Token
 from keystoneclient import session, auth
 from keystoneclient.exceptions import ClientException, HttpError
 
-from contrail_api_cli.client import APIClient
+from contrail_api_cli.client import APIClient, Cancelled, fan_out
+from contrail_api_cli.ratelimit import TokenBucket, AdaptiveConcurrency
 from contrail_api_cli.style import PromptStyle
-from contrail_api_cli import utils, commands
+from contrail_api_cli.auth import TokenCache
+from contrail_api_cli import utils, commands, catalog, render
 from contrail_api_cli.utils import ShellContext
+from contrail_api_cli.jobs import manager
 
 history = InMemoryHistory()
 completer = utils.PathCompleter(match_middle=True)
-utils.PathCompletionFiller(completer).start()
 
 
 def get_prompt_tokens(cli):
@@ -31,14 +35,169 @@ def get_prompt_tokens(cli):
     ]
 
 
+def get_toolbar_tokens(cli):
+    return [(Token.Toolbar, " [%d] %s %s " % (j.id, j.action, j.progress))
+            for j in manager.running()]
+
+
+def format_result(result):
+    if result is None:
+        return None
+    elif isinstance(result, utils.ResourceList):
+        ShellContext.completion_queue.put(result)
+        return "\n".join(result.relative_to(ShellContext.current_path))
+    elif type(result) == list:
+        output_paths = []
+        for p in result:
+            output_paths.append(str(p.relative_to(ShellContext.current_path)))
+            ShellContext.completion_queue.put(p)
+        return "\n".join(output_paths)
+    elif type(result) == dict:
+        return render.render(result, "json")
+    elif isinstance(result, types.GeneratorType):
+        return "\n".join(result)
+    else:
+        return str(result)
+
+
+def get_command(action_list):
+    cmd = getattr(commands, action_list[0])
+    if not isinstance(cmd, commands.BaseCommand):
+        raise AttributeError(action_list[0])
+    return cmd, action_list[1:]
+
+
+def print_result(func):
+    """
+    Call func and print its result
+
+    @rtype: int exit status
+    """
+    try:
+        result = func()
+    except (HttpError, ClientException, commands.CommandError, Cancelled) as e:
+        print(e)
+        return 1
+    except KeyboardInterrupt:
+        return 1
+    if isinstance(result, types.GeneratorType):
+        # print rows as soon as they are rendered
+        try:
+            for line in result:
+                print(line)
+        except KeyboardInterrupt:
+            return 1
+        return 0
+    output = format_result(result)
+    if output is not None:
+        print(output)
+    return 0
+
+
+def execute(action_list):
+    """
+    Run the command and print its result
+
+    @rtype: int exit status
+    """
+    try:
+        cmd, args = get_command(action_list)
+    except IndexError:
+        return 0
+    except AttributeError:
+        print("Command not found. Type help for all commands.")
+        return 1
+    return print_result(lambda: cmd.parse_and_call(*args))
+
+
+def print_job_done(job):
+    if not job.background:
+        return
+    print("[%d] %s %s" % (job.id, job.status, job.action))
+    print_result(job.result)
+
+
+def run(action):
+    """
+    Run a command from the shell.
+
+    Commands other than shell commands run as jobs. When action ends
+    with & the job runs in background, otherwise we wait for it.
+    """
+    action = action.strip()
+    background = action.endswith("&")
+    action_list = action.rstrip("&").split()
+    try:
+        cmd, args = get_command(action_list)
+    except IndexError:
+        return
+    except AttributeError:
+        print("Command not found. Type help for all commands.")
+        return
+    if isinstance(cmd, commands.ShellCommand):
+        print_result(lambda: cmd.parse_and_call(*args))
+        return
+    job = manager.submit(" ".join(action_list),
+                         lambda: cmd.parse_and_call(*args),
+                         background=background,
+                         on_done=print_job_done)
+    if background:
+        print("[%d] %s" % (job.id, job.action))
+    else:
+        print_result(lambda: manager.wait(job))
+
+
+def run_fan_out(clients, action_list, timeout=None):
+    try:
+        cmd, args = get_command(action_list)
+    except AttributeError:
+        print("Command not found. Type help for all commands.")
+        return 1
+    status = 0
+    results = fan_out(clients, lambda: cmd.parse_and_call(*args),
+                      timeout=timeout)
+    for client, result, error in results:
+        if error is not None:
+            status = 1
+            if isinstance(error, TimeoutError):
+                output = "timed out after %ss" % timeout
+            else:
+                output = str(error)
+        else:
+            output = format_result(result)
+        if output is None:
+            continue
+        for line in output.splitlines():
+            print("%s: %s" % (client.HOST, line))
+    return status
+
+
 def main():
     argv = sys.argv[1:]
 
     parser = argparse.ArgumentParser()
-    parser.add_argument('--host', default='localhost:8082',
-                        help="host:port to connect to (default='%(default)s')")
+    parser.add_argument('--host', action='append', default=None,
+                        help="host:port to connect to (default='localhost:8082'). "
+                             "Can be repeated to run a command on several clusters")
     parser.add_argument('--ssl', action="store_true", default=False,
                         help="connect with SSL (default=%(default)s)")
+    parser.add_argument('--rate-limit', type=float, default=None,
+                        help="maximum number of requests per second (default=no limit)")
+    parser.add_argument('--max-concurrency', type=int, default=None,
+                        help="adapt the number of concurrent requests to the "
+                             "server latency and errors, up to this number (default=no limit)")
+    parser.add_argument('--target-latency', type=float, default=1.0,
+                        help="request latency above which concurrency is reduced "
+                             "with --max-concurrency (default=%(default)s)")
+    parser.add_argument('--decode-workers', type=int, default=0,
+                        help="number of processes decoding big responses (default=%(default)s)")
+    parser.add_argument('--decode-threshold', type=int, default=APIClient.DECODE_THRESHOLD,
+                        help="size in bytes above which responses are decoded "
+                             "with --decode-workers (default=%(default)s)")
+    parser.add_argument('--no-token-cache', action="store_true", default=False,
+                        help="don't reuse or store keystone tokens on disk (default=%(default)s)")
+    parser.add_argument('command', nargs=argparse.REMAINDER,
+                        help="command to run instead of starting the shell")
     session.Session.register_cli_options(parser)
     # Default auth plugin will be http unless OS_AUTH_PLUGIN envvar is set
     auth.register_argparse_arguments(parser, argv, default="http")
@@ -46,59 +205,74 @@ def main():
 
     if options.ssl:
         APIClient.PROTOCOL = 'https'
-    if options.host:
-        APIClient.HOST = options.host
+    if options.rate_limit:
+        APIClient.RATE_LIMITER = TokenBucket(options.rate_limit)
+    if options.max_concurrency:
+        APIClient.CONCURRENCY = AdaptiveConcurrency(options.max_concurrency,
+                                                    latency=options.target_latency)
+    if options.decode_workers > 0:
+        APIClient.DECODE_POOL = ProcessPoolExecutor(max_workers=options.decode_workers)
+        APIClient.DECODE_THRESHOLD = options.decode_threshold
+        # fork the decode processes now, before any other thread
+        # is started (completion, catalog refresh, jobs)
+        APIClient.DECODE_POOL.submit(int).result()
+    hosts = options.host or [APIClient.HOST]
+    APIClient.HOST = hosts[0]
 
     auth_plugin = auth.load_from_argparse_arguments(options)
+    if not options.no_token_cache:
+        token_cache = TokenCache()
+        token_cache.load(auth_plugin)
+        atexit.register(token_cache.save, auth_plugin)
     APIClient.SESSION = session.Session.load_from_cli_options(options, auth=auth_plugin)
 
-    try:
-        for p in APIClient().list(ShellContext.current_path):
-            ShellContext.completion_queue.put(p)
-    except ClientException as e:
-        print(e)
-        sys.exit(1)
+    if len(hosts) > 1:
+        if not options.command:
+            parser.error("a command is required with multiple hosts")
+        clients = [APIClient(host=h,
+                             session=session.Session.load_from_cli_options(options, auth=auth_plugin))
+                   for h in hosts]
+        sys.exit(run_fan_out(clients, options.command, timeout=options.timeout))
+
+    if options.command:
+        try:
+            sys.exit(execute(options.command))
+        except EOFError:
+            sys.exit(0)
+
+    utils.PathCompletionFiller(completer).start()
+
+    # Use the cached catalog to start immediately and refresh it
+    # in background, otherwise wait for the home resources
+    home = catalog.get(APIClient.base_url)
+    if home.load():
+        home.refresh_in_background(
+            APIClient(),
+            on_done=lambda c: ShellContext.completion_queue.put(c.resources))
+    else:
+        try:
+            home.refresh(APIClient())
+        except ClientException as e:
+            print(e)
+            sys.exit(1)
+    ShellContext.completion_queue.put(home.resources)
 
     while True:
         try:
             action = prompt(get_prompt_tokens=get_prompt_tokens,
+                            get_bottom_toolbar_tokens=get_toolbar_tokens,
+                            refresh_interval=0.5,
+                            patch_stdout=True,
                             history=history,
                             completer=completer,
                             style=PromptStyle)
         except (EOFError, KeyboardInterrupt):
             break
         try:
-            action_list = action.split()
-            cmd = getattr(commands, action_list[0])
-            args = action_list[1:]
-        except IndexError:
-            continue
-        except AttributeError:
-            print("Command not found. Type help for all commands.")
-            continue
-
-        try:
-            result = cmd.parse_and_call(*args)
-        except (HttpError, ClientException, commands.CommandError) as e:
-            print(e)
-            continue
-        except KeyboardInterrupt:
-            continue
+            run(action)
         except EOFError:
             break
-        else:
-            if result is None:
-                continue
-            elif type(result) == list:
-                output_paths = []
-                for p in result:
-                    output_paths.append(str(p.relative_to(ShellContext.current_path)))
-                    ShellContext.completion_queue.put(p)
-                print("\n".join(output_paths))
-            elif type(result) == dict:
-                print(pprint.pformat(result, indent=2))
-            else:
-                print(result)
+    manager.cancel_all()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,86 @@
+import time
+import threading
+
+
+class TokenBucket(object):
+    """
+    Allow rate calls per second on average with bursts
+    of at most burst calls.
+
+    @type rate: float
+    @type burst: int
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = burst or max(int(rate), 1)
+        self.tokens = float(self.burst)
+        self.last = time.time()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Block until a call is allowed
+        """
+        while True:
+            with self.lock:
+                now = time.time()
+                self.tokens = min(self.burst,
+                                  self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class AdaptiveConcurrency(object):
+    """
+    Limit the number of concurrent calls with an AIMD algorithm.
+
+    The limit grows by one for each limit calls answered faster than
+    latency seconds and is halved when a call is slower or when the
+    server is overloaded. It is halved at most once per latency
+    period so that a burst of slow calls counts as one.
+
+    @type max_limit: int
+    @type min_limit: int
+    @type latency: float
+    """
+
+    def __init__(self, max_limit, min_limit=1, latency=1.0):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.latency = latency
+        self.limit = float(min(max(min_limit, 4), max_limit))
+        self.in_flight = 0
+        self.last_decrease = 0
+        self.cond = threading.Condition()
+
+    def acquire(self):
+        """
+        Block until a call can be made
+        """
+        with self.cond:
+            while self.in_flight >= int(self.limit):
+                self.cond.wait()
+            self.in_flight += 1
+
+    def release(self, latency, overloaded=False):
+        """
+        Signal the end of a call
+
+        @param latency: duration of the call
+        @param overloaded: True if the server reported an error
+        """
+        with self.cond:
+            self.in_flight -= 1
+            now = time.time()
+            if overloaded or latency > self.latency:
+                if now - self.last_decrease > self.latency:
+                    self.limit = max(self.min_limit, self.limit / 2)
+                    self.last_decrease = now
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self.cond.notify_all()
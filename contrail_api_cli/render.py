@@ -0,0 +1,141 @@
+import sys
+import json
+from itertools import chain, islice
+
+from pygments import highlight
+from pygments.lexers import JsonLexer, YamlLexer
+from pygments.formatters import Terminal256Formatter
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+from contrail_api_cli import utils
+
+
+FORMATS = ("json", "yaml", "table", "raw", "ndjson")
+# number of rows used to compute the width of table columns
+TABLE_SAMPLE = 100
+
+_lexers = {}
+_formatter = None
+
+
+def get_lexer(name):
+    if name not in _lexers:
+        _lexers[name] = {'json': JsonLexer,
+                         'yaml': YamlLexer}[name](indent=2)
+    return _lexers[name]
+
+
+def get_formatter():
+    global _formatter
+    if _formatter is None:
+        _formatter = Terminal256Formatter(bg="dark")
+    return _formatter
+
+
+def use_color(stream=None):
+    """
+    Colorize only when writing to a terminal
+    """
+    stream = stream or sys.stdout
+    return hasattr(stream, 'isatty') and stream.isatty()
+
+
+def colorize(text, lexer='json', color=None):
+    if color is None:
+        color = use_color()
+    if not color:
+        return text
+    return highlight(text, get_lexer(lexer), get_formatter())
+
+
+def to_json(data, indent=2):
+    if indent is None:
+        return json.dumps(data, sort_keys=True, separators=(',', ':'),
+                          cls=utils.PathEncoder)
+    return json.dumps(data, sort_keys=True, indent=indent,
+                      separators=(',', ': '), cls=utils.PathEncoder)
+
+
+def to_yaml(data):
+    if yaml is None:
+        raise ValueError("PyYAML is needed for the yaml format")
+    # use json to convert Paths and other objects to strings
+    return yaml.safe_dump(json.loads(to_json(data, indent=None)),
+                          default_flow_style=False)
+
+
+def _cell(value):
+    if isinstance(value, list) and all([isinstance(v, dict) and 'to' in v
+                                        for v in value]):
+        return ", ".join([str(v['to']) for v in value])
+    if isinstance(value, (dict, list)):
+        return to_json(value, indent=None)
+    return str(value)
+
+
+def table(rows, columns):
+    """
+    Render rows (dicts) as lines of a table.
+
+    Rows are consumed lazily, the width of columns is computed
+    on the first TABLE_SAMPLE rows only.
+    """
+    rows = iter(rows)
+    sample = [[_cell(r.get(c, '')) for c in columns]
+              for r in islice(rows, TABLE_SAMPLE)]
+    widths = [max([len(c)] + [len(row[idx]) for row in sample])
+              for idx, c in enumerate(columns)]
+    line_format = "  ".join(["%%-%ds" % w for w in widths])
+    yield (line_format % tuple(columns)).rstrip()
+    for row in chain(sample,
+                     ([_cell(r.get(c, '')) for c in columns] for r in rows)):
+        yield (line_format % tuple(row)).rstrip()
+
+
+def resource_rows(resources, path):
+    """
+    Rows of a ResourceList with paths relative to path
+    """
+    return ({'path': p, 'uuid': u, 'fq_name': f, 'type': t}
+            for p, u, f, t in zip(resources.relative_to(path),
+                                  resources.uuids, resources.fq_names,
+                                  resources.types))
+
+
+def render(data, fmt="json", color=None):
+    """
+    Render a resource (dict) in fmt. Table and ndjson
+    formats are returned as a generator of lines.
+    """
+    if fmt == "json":
+        return colorize(to_json(data), 'json', color)
+    elif fmt == "yaml":
+        return colorize(to_yaml(data), 'yaml', color)
+    elif fmt == "raw":
+        return to_json(data, indent=None)
+    elif fmt == "ndjson":
+        return (to_json(d, indent=None) for d in [data])
+    elif fmt == "table":
+        rows = ({'attr': k, 'value': v} for k, v in sorted(data.items()))
+        return table(rows, ['attr', 'value'])
+    raise ValueError("Unknown format %s" % fmt)
+
+
+def render_resources(resources, path, fmt="json", color=None):
+    """
+    Render a ResourceList in fmt. Table and ndjson formats
+    are returned as a generator of lines.
+    """
+    if fmt == "table":
+        return table(resource_rows(resources, path),
+                     ['path', 'uuid', 'fq_name', 'type'])
+    elif fmt == "ndjson":
+        return (to_json(r, indent=None)
+                for r in resource_rows(resources, path))
+    elif fmt == "raw":
+        return "\n".join(resources.relative_to(path))
+    return render(list(resource_rows(resources, path)), fmt, color)
@@ -12,6 +12,7 @@ class PromptStyle(Style):
         Token.At: 'bold #dadada',
         Token.Host: '#ffaf00',
         Token.Username: '#ffaf00',
+        Token.Toolbar: 'bg:#274B7A #ffffff',
 
         Token.Menu.Completions.Completion: 'bg:#74B3CC #204a87',
         Token.Menu.Completions.Completion.Current: 'bold bg:#274B7A #ffffff',
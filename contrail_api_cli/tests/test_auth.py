@@ -0,0 +1,92 @@
+import os
+import stat
+import shutil
+import tempfile
+import unittest
+import datetime
+
+from keystoneclient.access import AccessInfo
+from keystoneclient.auth.identity import v2
+
+from contrail_api_cli.auth import HTTPAuth, TokenCache
+
+
+def make_token(expires):
+    return {
+        'token': {
+            'id': 'token-id',
+            'expires': expires.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'tenant': {'id': 'tenant-id', 'name': 'admin'}
+        },
+        'user': {'id': 'user-id', 'name': 'admin', 'roles': []},
+        'serviceCatalog': []
+    }
+
+
+class TestAuth(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.cache = TokenCache(os.path.join(self.directory, 'tokens'))
+
+    def make_plugin(self, tenant_name='admin'):
+        return v2.Password(auth_url='http://localhost:5000/v2.0',
+                           username='admin', password='secret',
+                           tenant_name=tenant_name)
+
+    def test_http_auth_headers(self):
+        a = HTTPAuth('admin', 'secret')
+        headers = a.get_headers(None)
+        self.assertEqual(headers, {'Authorization': 'Basic YWRtaW46c2VjcmV0'})
+        self.assertIs(a.get_headers(None), headers)
+
+    def test_token_cache(self):
+        plugin = self.make_plugin()
+        self.assertFalse(self.cache.load(plugin))
+        expires = datetime.datetime.utcnow() + datetime.timedelta(hours=1)
+        plugin.auth_ref = AccessInfo.factory(
+            body={'access': make_token(expires)})
+        self.cache.save(plugin)
+
+        filename = self.cache._get_filename(plugin)
+        self.assertEqual(stat.S_IMODE(os.stat(filename).st_mode), 0o600)
+
+        plugin = self.make_plugin()
+        self.assertTrue(self.cache.load(plugin))
+        self.assertEqual(plugin.auth_ref.auth_token, 'token-id')
+        # other project doesn't use the token
+        plugin = self.make_plugin(tenant_name='demo')
+        self.assertFalse(self.cache.load(plugin))
+
+    def test_token_cache_expired(self):
+        plugin = self.make_plugin()
+        expires = datetime.datetime.utcnow() + datetime.timedelta(seconds=10)
+        plugin.auth_ref = AccessInfo.factory(
+            body={'access': make_token(expires)})
+        self.cache.save(plugin)
+        plugin = self.make_plugin()
+        self.assertFalse(self.cache.load(plugin))
+        self.assertIsNone(plugin.auth_ref)
+
+    def test_token_cache_not_writable(self):
+        # the cache directory can't be created under a file
+        path = os.path.join(self.directory, 'file')
+        open(path, 'w').close()
+        cache = TokenCache(os.path.join(path, 'tokens'))
+        plugin = self.make_plugin()
+        expires = datetime.datetime.utcnow() + datetime.timedelta(hours=1)
+        plugin.auth_ref = AccessInfo.factory(
+            body={'access': make_token(expires)})
+        cache.save(plugin)
+        self.assertFalse(cache.load(self.make_plugin()))
+
+    def test_token_cache_http_auth(self):
+        a = HTTPAuth('admin', 'secret')
+        self.cache.save(a)
+        self.assertFalse(self.cache.load(a))
+        self.assertFalse(os.path.exists(self.cache.directory))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,168 @@
+import json
+import time
+import threading
+import unittest
+try:
+    import mock
+except ImportError:
+    import unittest.mock as mock
+
+from six.moves.BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+from keystoneclient import session
+
+import contrail_api_cli.commands as cmds
+from contrail_api_cli.client import APIClient, Cancelled
+from contrail_api_cli.jobs import JobManager
+from contrail_api_cli.ratelimit import TokenBucket, AdaptiveConcurrency
+from contrail_api_cli.utils import Path, ShellContext
+
+
+UUIDS = ["ec1afeaa-8930-43b0-a60a-939f23a50724",
+         "c2588045-d6fb-4f37-9f46-9451f653fb6a"]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Minimal contrail API server with a foo collection
+    """
+
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, data, status=200):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        base_url = "http://%s:%s" % self.server.server_address
+        path, _, query = self.path.partition("?")
+        if path == "/foos" and "count" in query:
+            self.send_json({"foos": {"count": len(UUIDS)}})
+        elif path == "/foos":
+            self.send_json({"foos": [{"href": base_url + "/foo/" + u,
+                                      "uuid": u,
+                                      "fq_name": ["foo", u]}
+                                     for u in UUIDS]})
+        elif path == "/bars":
+            self.send_json({"bars": []})
+        elif path.startswith("/foo/") and path[5:] in UUIDS:
+            self.send_json({"foo": {"href": base_url + path,
+                                    "uuid": path[5:]}})
+        else:
+            self.send_json({}, status=404)
+
+    def do_POST(self):
+        data = json.loads(self.rfile.read(int(self.headers['Content-Length'])).decode('utf-8'))
+        if data["fq_name"][1] == UUIDS[0]:
+            self.send_json({"uuid": UUIDS[0]})
+        else:
+            # make some requests fail
+            self.send_json({}, status=404)
+
+
+class TestBench(unittest.TestCase):
+
+    def setUp(self):
+        self.server = HTTPServer(("127.0.0.1", 0), StubHandler)
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.client = APIClient(host="%s:%s" % self.server.server_address,
+                                session=session.Session())
+        ShellContext.current_path = Path("/")
+
+    def test_bench(self):
+        with self.client.bind():
+            result = cmds.bench(resource=["foo", "bar"], workers=2,
+                                requests=100, mix="list:1,get:1,fqname:1,count:1")
+        lines = result.splitlines()
+        self.assertEqual(lines[0].split()[0], "endpoint")
+        rows = dict([(line.split()[0], line.split()[1:]) for line in lines[1:]])
+        self.assertEqual(sorted(rows), ["count", "fqname", "get", "list", "total"])
+        self.assertEqual(int(rows["total"][0]), 100)
+        self.assertEqual(int(rows["get"][1]), 0)
+        self.assertEqual(int(rows["list"][1]), 0)
+        self.assertGreater(int(rows["fqname"][1]), 0)
+
+    def test_bench_duration(self):
+        with self.client.bind():
+            result = cmds.bench(resource=["bar"], workers=2, duration=0.2)
+        rows = [line.split()[0] for line in result.splitlines()[1:]]
+        self.assertEqual(rows, ["count", "list", "total"])
+
+    @mock.patch('contrail_api_cli.client.APIClient.RATE_LIMITER',
+                TokenBucket(50, burst=1))
+    @mock.patch('contrail_api_cli.client.APIClient.CONCURRENCY',
+                AdaptiveConcurrency(1))
+    def test_bench_throttled(self):
+        with self.client.bind():
+            result = cmds.bench(resource=["foo"], workers=2, requests=10)
+        lines = result.splitlines()
+        self.assertEqual(lines[-2], "Throttled by --rate-limit (50 req/s)")
+        self.assertEqual(lines[-1], "Throttled by --max-concurrency "
+                                    "(down to 1 concurrent requests for 2 workers)")
+
+    def test_bench_cancel(self):
+        def func():
+            with self.client.bind():
+                return cmds.bench(resource=["foo"], workers=2, duration=10)
+
+        job = JobManager().submit("bench foo", func, background=True)
+        time.sleep(0.2)
+        start = time.time()
+        job.cancel()
+        with self.assertRaises(Cancelled):
+            job.result()
+        self.assertLess(time.time() - start, 1)
+
+    def test_bench_worker_failure(self):
+        calls = []
+
+        def call(*args):
+            calls.append(1)
+            if len(calls) == 5:
+                raise ValueError("bad body")
+            time.sleep(0.01)
+
+        start = time.time()
+        with mock.patch.object(cmds.Bench, '_call', side_effect=call):
+            with self.client.bind():
+                with self.assertRaises(ValueError):
+                    cmds.bench(resource=["foo"], workers=2, duration=10)
+            self.assertLess(time.time() - start, 1)
+            # the other worker stops after its current request
+            time.sleep(0.05)
+            count = len(calls)
+            time.sleep(0.1)
+            self.assertEqual(len(calls), count)
+
+    def test_bench_deadline(self):
+        deadlines = []
+
+        def worker(client, weights, collections, resources, deadline, *args):
+            deadlines.append(deadline)
+
+        with mock.patch.object(cmds.Bench, '_worker', side_effect=worker):
+            with self.client.bind():
+                # -n alone runs until the requests are made
+                cmds.bench(resource=["foo"], workers=1, requests=1000)
+                cmds.bench(resource=["foo"], workers=1)
+                cmds.bench(resource=["foo"], workers=1, duration=60,
+                           requests=1000)
+        self.assertIsNone(deadlines[0])
+        self.assertAlmostEqual(deadlines[1] - time.time(), 10, delta=1)
+        self.assertAlmostEqual(deadlines[2] - time.time(), 60, delta=1)
+
+    def test_bench_bad_mix(self):
+        with self.assertRaises(cmds.CommandError):
+            cmds.bench(mix="foo:1")
+
+
+if __name__ == "__main__":
+    unittest.main()
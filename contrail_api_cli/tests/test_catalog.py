@@ -0,0 +1,83 @@
+import shutil
+import tempfile
+import unittest
+try:
+    import mock
+except ImportError:
+    import unittest.mock as mock
+
+import contrail_api_cli.commands as cmds
+from contrail_api_cli import catalog
+from contrail_api_cli.client import APIClient
+from contrail_api_cli.utils import Path, ShellContext
+
+
+HOME = {
+    "href": APIClient.base_url,
+    "links": [
+        {"link": {"href": APIClient.base_url + "/foos",
+                  "name": "foo",
+                  "rel": "collection"}},
+        {"link": {"href": APIClient.base_url + "/foo",
+                  "name": "foo",
+                  "rel": "resource-base"}}
+    ]
+}
+
+
+class TestCatalog(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def make_catalog(self):
+        return catalog.Catalog(APIClient.base_url, directory=self.directory)
+
+    @mock.patch('contrail_api_cli.client.APIClient.get_raw')
+    def test_catalog(self, mock_get_raw):
+        mock_get_raw.return_value = HOME
+        c = self.make_catalog()
+        self.assertFalse(c.load())
+        self.assertTrue(c.has_type("bar"))
+        c.refresh(APIClient())
+        self.assertEqual(c.resources, [Path("/foo")])
+        self.assertTrue(c.has_type("foo"))
+        self.assertFalse(c.has_type("bar"))
+
+        c = self.make_catalog()
+        self.assertTrue(c.load())
+        self.assertEqual(c.resources, [Path("/foo")])
+        self.assertEqual(c.resources.types, ["foo"])
+
+        c.VERSION = 0
+        self.assertFalse(c.load())
+
+    @mock.patch('contrail_api_cli.client.APIClient.get_raw')
+    def test_refresh_in_background(self, mock_get_raw):
+        mock_get_raw.return_value = HOME
+        done = mock.Mock()
+        c = self.make_catalog()
+        c.refresh_in_background(APIClient(), on_done=done).join()
+        done.assert_called_once_with(c)
+        self.assertEqual(c.resources, [Path("/foo")])
+
+    @mock.patch('contrail_api_cli.client.APIClient.get_raw')
+    def test_commands_use_catalog(self, mock_get_raw):
+        mock_get_raw.return_value = HOME
+        c = self.make_catalog()
+        c.refresh(APIClient())
+        mock_get_raw.reset_mock()
+        with mock.patch.dict(catalog._catalogs, {APIClient.base_url: c}):
+            ShellContext.current_path = Path("/")
+            self.assertEqual(cmds.ls(), [Path("/foo")])
+            self.assertFalse(mock_get_raw.called)
+            with self.assertRaises(cmds.CommandError):
+                cmds.ls("bar")
+            with self.assertRaises(cmds.CommandError):
+                cmds.cd("bar")
+            self.assertEqual(ShellContext.current_path, Path("/"))
+
+
+if __name__ == "__main__":
+    unittest.main()
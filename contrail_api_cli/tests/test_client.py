@@ -0,0 +1,147 @@
+import time
+import json
+import threading
+import pickle
+import unittest
+from concurrent.futures import TimeoutError, ProcessPoolExecutor
+try:
+    import mock
+except ImportError:
+    import unittest.mock as mock
+
+from contrail_api_cli.client import APIClient, SingleFlight, fan_out
+from contrail_api_cli.utils import Path
+
+
+class TestClient(unittest.TestCase):
+
+    def test_instance_settings(self):
+        c = APIClient(host="foo:8082", protocol="https")
+        self.assertEqual(c.base_url, "https://foo:8082")
+        self.assertEqual(APIClient.base_url, "http://localhost:8082")
+
+    def test_bind(self):
+        s = mock.Mock()
+        c = APIClient(host="foo:8082", session=s)
+        with c.bind():
+            self.assertEqual(APIClient().HOST, "foo:8082")
+            self.assertEqual(APIClient().SESSION, s)
+        self.assertEqual(APIClient().HOST, APIClient.HOST)
+
+    def test_decode_with_instance_base_url(self):
+        c = APIClient(host="foo:8082", session=mock.Mock())
+        c.SESSION.get.return_value.json.side_effect = \
+            lambda object_hook: object_hook({"href": "http://foo:8082/bar"})
+        data = c.get(mock.Mock(is_collection=False,
+                               is_absolute=lambda: True))
+        self.assertEqual(str(data["href"]), "/bar")
+
+    def test_fan_out(self):
+        clients = [APIClient(host="a"), APIClient(host="b")]
+
+        def func():
+            if APIClient().HOST == "b":
+                raise ValueError("b failed")
+            return APIClient().HOST
+
+        results = fan_out(clients, func)
+        self.assertEqual(results[0], (clients[0], "a", None))
+        self.assertEqual(results[1][0], clients[1])
+        self.assertIsInstance(results[1][2], ValueError)
+
+    def test_fan_out_timeout(self):
+        clients = [APIClient(host="slow"), APIClient(host="fast")]
+        daemons = []
+
+        def func():
+            # abandoned workers must not block the interpreter exit
+            daemons.append(threading.current_thread().daemon)
+            if APIClient().HOST == "slow":
+                time.sleep(0.5)
+            return APIClient().HOST
+
+        start = time.time()
+        results = fan_out(clients, func, timeout=0.1)
+        self.assertLess(time.time() - start, 0.4)
+        self.assertIsInstance(results[0][2], TimeoutError)
+        self.assertEqual(results[1], (clients[1], "fast", None))
+        self.assertEqual(daemons, [True, True])
+
+    def test_single_flight(self):
+        sf = SingleFlight()
+        calls = []
+
+        def func():
+            calls.append(1)
+            time.sleep(0.1)
+            return "result"
+
+        results = fan_out([APIClient() for i in range(5)],
+                          lambda: sf.do("key", func))
+        self.assertEqual([r[1] for r in results], ["result"] * 5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sf.requests, 1)
+        self.assertEqual(sf.saved, 4)
+        self.assertEqual(sf.do("key", lambda: "other"), "other")
+
+    def test_single_flight_error(self):
+        sf = SingleFlight()
+
+        def func():
+            time.sleep(0.1)
+            raise ValueError()
+
+        results = fan_out([APIClient() for i in range(3)],
+                          lambda: sf.do("key", func))
+        for client, result, error in results:
+            self.assertIsInstance(error, ValueError)
+        self.assertEqual(sf.calls, {})
+
+    def test_get_single_flight(self):
+        session = mock.Mock()
+        session.get.side_effect = lambda *a, **kw: time.sleep(0.1) or mock.Mock(
+            json=lambda object_hook: {"uuid": "foo"})
+        c = APIClient(session=session)
+        path = Path("/foo")
+        results = fan_out([c, c, c], lambda: c.get(path, detail=True))
+        self.assertEqual([r[1] for r in results], [{"uuid": "foo"}] * 3)
+        self.assertEqual(session.get.call_count, 1)
+        results = fan_out([c, c], lambda: c.get(path, detail=True))
+        self.assertEqual(session.get.call_count, 2)
+
+    def test_decode_pool(self):
+        pool = ProcessPoolExecutor(max_workers=1)
+        self.addCleanup(pool.shutdown)
+        session = mock.Mock()
+        c = APIClient(session=session)
+        c.DECODE_POOL = pool
+        c.DECODE_THRESHOLD = 10
+        resource = {"foo": {"href": c.base_url + "/foo/a",
+                            "fq_name": ["foo", "a"]}}
+        collection = {"foos": [{"href": c.base_url + "/foo/a",
+                                "uuid": "a",
+                                "fq_name": ["foo", "a"]}]}
+
+        session.get.return_value = mock.Mock(content=json.dumps(resource).encode('utf-8'))
+        self.assertEqual(c.get_raw(Path("/foo/a")), resource)
+        self.assertFalse(session.get.return_value.json.called)
+        # responses with Paths are decoded in the thread
+        c.get(Path("/foo/a"))
+        self.assertTrue(session.get.return_value.json.called)
+
+        session.get.return_value = mock.Mock(content=json.dumps(collection).encode('utf-8'))
+        resources = c.get_resources(Path("/foo"))
+        self.assertEqual(resources, [Path("/foo/a")])
+        self.assertEqual(resources.fq_names, ["foo:a"])
+        self.assertEqual(resources.types, ["foo"])
+
+    def test_pickle_path(self):
+        p = Path("/foo/a")
+        p.meta["fq_name"] = "foo:a"
+        p = pickle.loads(pickle.dumps(p))
+        self.assertEqual(p, Path("/foo/a"))
+        self.assertEqual(p.meta, {"fq_name": "foo:a"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,8 @@
+import os
+import json
+import gzip
+import shutil
+import tempfile
 import unittest
 import uuid
 try:
@@ -5,8 +10,10 @@ try:
 except ImportError:
     import unittest.mock as mock
 
+from keystoneclient.exceptions import HttpError
+
 import contrail_api_cli.commands as cmds
-from contrail_api_cli.utils import Path, ShellContext
+from contrail_api_cli.utils import Path, ShellContext, ResourceList
 from contrail_api_cli.client import APIClient
 
 
@@ -24,36 +31,41 @@ class TestCommands(unittest.TestCase):
         cmds.cd('/')
         self.assertEqual(ShellContext.current_path, Path("/"))
 
-    @mock.patch('contrail_api_cli.commands.APIClient.get')
-    def test_home_ls(self, mock_get):
+    @mock.patch('contrail_api_cli.commands.APIClient.get_raw')
+    def test_home_ls(self, mock_get_raw):
         ShellContext.current_path = Path("/")
         expected_home_resources = [
             Path("/instance-ip"),
         ]
 
-        mock_get.return_value = {
+        mock_get_raw.return_value = {
             "href": APIClient.base_url,
             "links": [
-                {"link": {"href": Path("/instance-ip"),
+                {"link": {"href": APIClient.base_url + "/instance-ips",
                           "name": "instance-ip",
                           "rel": "collection"}},
-                {"link": {"href": Path("/instance-ip"),
+                {"link": {"href": APIClient.base_url + "/instance-ip",
                           "name": "instance-ip",
                           "rel": "resource-base"}}
             ]
         }
         result = cmds.ls()
         self.assertEqual(result, expected_home_resources)
+        self.assertEqual(result.types, ["instance-ip"])
+        self.assertEqual(result.relative_to(ShellContext.current_path),
+                         ["instance-ip"])
 
-    @mock.patch('contrail_api_cli.commands.APIClient.get')
+    @mock.patch('contrail_api_cli.commands.APIClient._get')
     def test_resources_ls(self, mock_get):
         ShellContext.current_path = Path("/instance-ip")
-        mock_get.return_value = {
+        mock_get.return_value.json.return_value = {
             "instance-ips": [
-                {"href": Path("/instance-ip/ec1afeaa-8930-43b0-a60a-939f23a50724"),
-                 "uuid": "ec1afeaa-8930-43b0-a60a-939f23a50724"},
-                {"href": Path("/instance-ip/c2588045-d6fb-4f37-9f46-9451f653fb6a"),
-                 "uuid": "c2588045-d6fb-4f37-9f46-9451f653fb6a"}
+                {"href": APIClient.base_url + "/instance-ip/ec1afeaa-8930-43b0-a60a-939f23a50724",
+                 "uuid": "ec1afeaa-8930-43b0-a60a-939f23a50724",
+                 "fq_name": ["ec1afeaa-8930-43b0-a60a-939f23a50724"]},
+                {"href": APIClient.base_url + "/instance-ip/c2588045-d6fb-4f37-9f46-9451f653fb6a",
+                 "uuid": "c2588045-d6fb-4f37-9f46-9451f653fb6a",
+                 "fq_name": ["c2588045-d6fb-4f37-9f46-9451f653fb6a"]}
             ]
         }
         expected_resources = [
@@ -62,6 +74,13 @@ class TestCommands(unittest.TestCase):
         ]
         result = cmds.ls()
         self.assertEqual(result, expected_resources)
+        self.assertEqual(result.uuids, ["ec1afeaa-8930-43b0-a60a-939f23a50724",
+                                        "c2588045-d6fb-4f37-9f46-9451f653fb6a"])
+        self.assertEqual(result[0].meta["fq_name"],
+                         "ec1afeaa-8930-43b0-a60a-939f23a50724")
+        self.assertEqual(result.relative_to(ShellContext.current_path),
+                         ["ec1afeaa-8930-43b0-a60a-939f23a50724",
+                          "c2588045-d6fb-4f37-9f46-9451f653fb6a"])
 
     @mock.patch('contrail_api_cli.commands.APIClient.get')
     @mock.patch('contrail_api_cli.commands.Ls.colorize')
@@ -218,6 +237,191 @@ class TestCommands(unittest.TestCase):
             mock.call(Path("/foo/6b6a7f47-807e-4c39-8ac6-3adcf2f5498f"))
         ])
 
+    @mock.patch('contrail_api_cli.commands.APIClient.get')
+    @mock.patch('contrail_api_cli.commands.APIClient.delete')
+    @mock.patch('contrail_api_cli.commands.Rm.retry_delay', 0)
+    def test_rm_resume(self, mock_delete, mock_get):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        ShellContext.current_path = Path("/")
+        t = "foo/6b6a7f47-807e-4c39-8ac6-3adcf2f5498f"
+        bar = Path("/bar/22916187-5b6f-40f1-b7b6-fc6fe9f23bce")
+        foobar = Path("/foobar/1050223f-a230-4ed6-96f1-c332700c5e01")
+        mock_get.side_effect = [
+            {'foo': {'href': Path("/" + t),
+                     'bar_back_refs': [{"href": bar}]}},
+            {'bar': {'href': bar,
+                     'foobar_back_refs': [{'href': foobar}]}},
+            {'foobar': {'href': foobar}}
+        ]
+        # foobar is deleted, bar fails after retries
+        mock_delete.side_effect = [True] + [HttpError(http_status=503)] * 4
+        with mock.patch.dict(os.environ, {'XDG_CACHE_HOME': tmp}):
+            with self.assertRaises(cmds.CommandError):
+                cmds.rm(resource=t, recursive=True, force=True)
+            self.assertEqual(mock_delete.call_count, 5)
+
+            # already deleted bar is ignored
+            mock_delete.reset_mock()
+            mock_delete.side_effect = [HttpError(http_status=404), True]
+            cmds.rm(resource=t, resume=True, force=True)
+            mock_delete.assert_has_calls([
+                mock.call(bar),
+                mock.call(Path("/" + t))
+            ])
+            self.assertEqual(mock_delete.call_count, 2)
+            self.assertEqual(mock_get.call_count, 3)
+
+            with self.assertRaises(cmds.CommandError):
+                cmds.rm(resource=t, resume=True, force=True)
+
+    @mock.patch('contrail_api_cli.commands.APIClient.list')
+    @mock.patch('contrail_api_cli.commands.APIClient.get')
+    @mock.patch('contrail_api_cli.commands.APIClient.delete')
+    @mock.patch('contrail_api_cli.commands.Rm.retry_delay', 0)
+    def test_rm_resume_glob(self, mock_delete, mock_get, mock_list):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        ShellContext.current_path = Path("/foo")
+        net1 = Path("/foo/ec1afeaa-8930-43b0-a60a-939f23a50724")
+        net2 = Path("/foo/c2588045-d6fb-4f37-9f46-9451f653fb6a")
+        mock_list.return_value = ResourceList(
+            paths=[str(net1), str(net2)],
+            fq_names=["default-domain:admin:net-1",
+                      "default-domain:admin:net-2"])
+        mock_get.side_effect = lambda path: {'foo': {'href': path}}
+        failing = set([net1])
+
+        def delete(path):
+            if path in failing:
+                raise HttpError(http_status=503)
+        mock_delete.side_effect = delete
+        resource = ["default-domain:admin:net-*"]
+        with mock.patch.dict(os.environ, {'XDG_CACHE_HOME': tmp}):
+            with self.assertRaises(cmds.CommandError):
+                cmds.rm(resource=resource, recursive=True, force=True)
+            self.assertIn(mock.call(net2), mock_delete.mock_calls)
+
+            # the glob now only matches net-1 but the
+            # journal is found with the arguments
+            mock_list.reset_mock()
+            mock_delete.reset_mock()
+            mock_list.return_value = ResourceList(
+                paths=[str(net1)], fq_names=["default-domain:admin:net-1"])
+            failing.clear()
+            cmds.rm(resource=resource, resume=True, force=True)
+            self.assertEqual(mock_delete.mock_calls, [mock.call(net1)])
+            self.assertEqual(mock_list.call_count, 0)
+
+            # a different current path is a different delete
+            ShellContext.current_path = Path("/")
+            with self.assertRaises(cmds.CommandError):
+                cmds.rm(resource=resource, resume=True, force=True)
+
+    @mock.patch('contrail_api_cli.commands.APIClient.list')
+    @mock.patch('contrail_api_cli.commands.APIClient.get')
+    @mock.patch('contrail_api_cli.commands.Ls.colorize')
+    def test_glob_ls(self, mock_colorize, mock_get, mock_list):
+        ShellContext.current_path = Path("/")
+        mock_list.side_effect = lambda path: {
+            Path("/"): ResourceList(paths=["/foo", "/bar"]),
+            Path("/foo"): ResourceList(
+                paths=["/foo/ec1afeaa-8930-43b0-a60a-939f23a50724",
+                       "/foo/c2588045-d6fb-4f37-9f46-9451f653fb6a"]),
+            Path("/foo/ec1afeaa-8930-43b0-a60a-939f23a50724"): {"uuid": "ec1afeaa"},
+            Path("/foo/c2588045-d6fb-4f37-9f46-9451f653fb6a"): {"uuid": "c2588045"}
+        }[path]
+        mock_colorize.side_effect = lambda d: d["uuid"]
+        result = cmds.ls(resource=["foo/*"])
+        self.assertEqual(result, "ec1afeaa\nc2588045")
+        result = cmds.ls(resource=["foo/c*", "f*"])
+        self.assertEqual(result, "c2588045\nfoo/ec1afeaa-8930-43b0-a60a-939f23a50724\nfoo/c2588045-d6fb-4f37-9f46-9451f653fb6a")
+        self.assertIsNone(cmds.ls(resource=["x*"]))
+        self.assertEqual(mock_list.call_count, 8)
+
+    @mock.patch('contrail_api_cli.commands.APIClient.get')
+    @mock.patch('contrail_api_cli.commands.APIClient.list')
+    def test_glob_count(self, mock_list, mock_get):
+        ShellContext.current_path = Path("/")
+        mock_list.return_value = ResourceList(paths=["/foo", "/bar", "/foobar"])
+        mock_get.side_effect = lambda path, count: {
+            path.resource_name + 's': {'count': len(path.resource_name)}
+        }
+        self.assertEqual(cmds.count(resource=["foo*"]), "foo: 3\nfoobar: 6")
+        self.assertEqual(cmds.count(resource=["foo", "bar"]), "foo: 3\nbar: 3")
+
+    @mock.patch('contrail_api_cli.commands.APIClient.list')
+    @mock.patch('contrail_api_cli.commands.APIClient.delete')
+    def test_fqname_glob_rm(self, mock_delete, mock_list):
+        ShellContext.current_path = Path("/foo")
+        mock_list.return_value = ResourceList(
+            paths=["/foo/ec1afeaa-8930-43b0-a60a-939f23a50724",
+                   "/foo/c2588045-d6fb-4f37-9f46-9451f653fb6a",
+                   "/foo/b25f5a6b-292f-4d0c-b5c6-22ad7209abe5"],
+            fq_names=["default-domain:admin:net-1",
+                      "default-domain:admin:net-2",
+                      "default-domain:demo:net-1"])
+        cmds.rm(resource=["default-domain:admin:net-*"], force=True)
+        mock_list.assert_called_once_with(Path("/foo"))
+        mock_delete.assert_has_calls([
+            mock.call(Path("/foo/ec1afeaa-8930-43b0-a60a-939f23a50724")),
+            mock.call(Path("/foo/c2588045-d6fb-4f37-9f46-9451f653fb6a"))
+        ], any_order=True)
+        self.assertEqual(mock_delete.call_count, 2)
+
+    @mock.patch('contrail_api_cli.commands.APIClient.get_raw')
+    def test_export(self, mock_get_raw):
+        ShellContext.current_path = Path("/foo")
+        uuids = [str(uuid.uuid4()) for i in range(5)]
+
+        def get_raw(path, **kwargs):
+            if 'obj_uuids' not in kwargs:
+                return {'foos': [{'uuid': u} for u in uuids]}
+            return {'foos': [{'foo': {'uuid': u,
+                                      'href': APIClient.base_url + '/foo/' + u}}
+                             for u in kwargs['obj_uuids'].split(',')]}
+
+        mock_get_raw.side_effect = get_raw
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        output = os.path.join(tmp, 'foo.json.gz')
+        result = cmds.export(output=output, batch_size=2)
+        self.assertEqual(result, "Exported 5 resources to %s" % output)
+        self.assertEqual(mock_get_raw.call_count, 4)
+        with gzip.open(output, 'rb') as f:
+            lines = [json.loads(line.decode('utf-8')) for line in f]
+        self.assertEqual([line['foo']['uuid'] for line in lines], uuids)
+        self.assertEqual(lines[0]['foo']['href'],
+                         APIClient.base_url + '/foo/' + uuids[0])
+
+    @mock.patch('contrail_api_cli.commands.APIClient.post')
+    def test_import(self, mock_post):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        filename = os.path.join(tmp, 'foo.json')
+        resources = [
+            {'foo': {'uuid': str(uuid.uuid4()),
+                     'href': APIClient.base_url + '/foo/1',
+                     'fq_name': ['foo', 'bar'],
+                     'bar_refs': [{'to': ['bar'], 'href': 'x', 'uuid': 'y'}],
+                     'bar_back_refs': [{'to': ['bar'], 'href': 'x'}],
+                     'bars': [{'to': ['bar'], 'href': 'x'}]}},
+            {'foo': {'uuid': str(uuid.uuid4())}}
+        ]
+        with open(filename, 'w') as f:
+            for r in resources:
+                f.write(json.dumps(r) + "\n")
+        result = cmds.import_(filename)
+        self.assertEqual(result, "Imported 2 resources, 0 failures")
+        mock_post.assert_has_calls([
+            mock.call(Path("/foos"),
+                      {'foo': {'uuid': resources[0]['foo']['uuid'],
+                               'fq_name': ['foo', 'bar'],
+                               'bar_refs': [{'to': ['bar'], 'uuid': 'y'}]}}),
+            mock.call(Path("/foos"), resources[1])
+        ], any_order=True)
+        self.assertIs(getattr(cmds, 'import'), cmds.import_)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,143 @@
+import time
+import threading
+import unittest
+try:
+    import mock
+except ImportError:
+    import unittest.mock as mock
+
+import contrail_api_cli.commands as cmds
+from contrail_api_cli.client import APIClient, Cancelled
+from contrail_api_cli.jobs import Job, JobManager, set_progress, confirm
+from contrail_api_cli.utils import Path
+
+
+class TestJobs(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = JobManager()
+        patcher = mock.patch('contrail_api_cli.commands.manager', self.manager)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_job(self):
+        started = threading.Event()
+        finish = threading.Event()
+
+        def func():
+            set_progress("half")
+            started.set()
+            finish.wait()
+            return "result"
+
+        job = self.manager.submit("foo", func, background=True)
+        started.wait()
+        self.assertEqual(job.status, "Running")
+        self.assertEqual(job.progress, "half")
+        self.assertEqual(self.manager.running(), [job])
+        self.assertEqual(cmds.jobs(), "[1] Running    foo half")
+        finish.set()
+        self.assertEqual(cmds.fg(), "result")
+        self.assertEqual(job.status, "Done")
+        self.assertFalse(job.background)
+        self.assertEqual(self.manager.list(), [])
+
+    def test_many_background_jobs(self):
+        finish = threading.Event()
+        self.addCleanup(finish.set)
+        jobs = [self.manager.submit("ls foo", finish.wait, background=True)
+                for i in range(20)]
+        # a foreground command doesn't wait for background ones
+        job = self.manager.submit("count foo", lambda: 3)
+        self.assertEqual(self.manager.wait(job), 3)
+        self.assertEqual(len(self.manager.running()), len(jobs))
+        self.assertEqual(Job(None, "ls", None).status, "Queued")
+
+    def test_foreground_job(self):
+        finish = threading.Event()
+        background = self.manager.submit("ls foo", finish.wait,
+                                         background=True)
+        job = self.manager.submit("count foo", lambda: 3)
+        self.assertEqual(self.manager.wait(job), 3)
+        self.assertIsNone(job.id)
+        self.assertEqual(self.manager.list(), [background])
+        # fg picks the background job, not the last one
+        self.assertIs(self.manager.get(), background)
+        finish.set()
+        background.result()
+        # finished background jobs are forgotten
+        while self.manager.list():
+            time.sleep(0.01)
+
+    def test_cancel_in_flight_request(self):
+        session = mock.Mock()
+        session.get.side_effect = lambda *a, **kw: time.sleep(1)
+
+        def func():
+            APIClient(session=session).get(Path("/foo"))
+
+        job = self.manager.submit("ls foo", func, background=True)
+        time.sleep(0.1)
+        start = time.time()
+        cmds.kill(job.id)
+        with self.assertRaises(Cancelled):
+            job.result()
+        self.assertLess(time.time() - start, 0.5)
+        self.assertEqual(job.status, "Cancelled")
+
+    def test_cancel_in_flight_delete(self):
+        session = mock.Mock()
+        session.delete.side_effect = lambda *a, **kw: time.sleep(0.3)
+        deleted = []
+
+        def func():
+            client = APIClient(session=session)
+            deleted.append(client.delete(Path("/foo")))
+            client.get(Path("/bar"))
+
+        job = self.manager.submit("rm foo", func, background=True)
+        time.sleep(0.1)
+        cmds.kill(job.id)
+        # the delete is not abandoned, the next request is cancelled
+        with self.assertRaises(Cancelled):
+            job.result()
+        self.assertEqual(deleted, [True])
+        self.assertFalse(session.get.called)
+
+    @mock.patch('contrail_api_cli.jobs.utils.continue_prompt')
+    def test_confirm(self, mock_continue_prompt):
+        threads = []
+
+        def ask(message):
+            threads.append(threading.current_thread())
+            return True
+        mock_continue_prompt.side_effect = ask
+
+        # the background job waits until we wait for it
+        job = self.manager.submit("rm foo", lambda: confirm("sure?"),
+                                  background=True)
+        while job.status != "Waiting":
+            time.sleep(0.01)
+        self.assertEqual(job.progress, "waiting for confirmation (fg 1)")
+        self.assertFalse(mock_continue_prompt.called)
+        self.assertTrue(job.result())
+        self.assertEqual(threads, [threading.current_thread()])
+
+        job = self.manager.submit("rm foo", lambda: confirm("sure?"),
+                                  background=True)
+        while job.status != "Waiting":
+            time.sleep(0.01)
+        cmds.kill(job.id)
+        with self.assertRaises(Cancelled):
+            job.result()
+        self.assertEqual(mock_continue_prompt.call_count, 1)
+
+    def test_no_such_job(self):
+        with self.assertRaises(cmds.CommandError):
+            cmds.fg()
+        with self.assertRaises(cmds.CommandError):
+            cmds.kill(42)
+
+
+if __name__ == "__main__":
+    unittest.main()
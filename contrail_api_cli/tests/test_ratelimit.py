@@ -0,0 +1,82 @@
+import time
+import unittest
+try:
+    import mock
+except ImportError:
+    import unittest.mock as mock
+
+from keystoneclient.exceptions import HttpError
+
+import contrail_api_cli.commands as cmds
+from contrail_api_cli.ratelimit import TokenBucket, AdaptiveConcurrency
+from contrail_api_cli.client import APIClient
+from contrail_api_cli.utils import Path, ShellContext
+
+
+class TestRateLimit(unittest.TestCase):
+
+    def test_token_bucket(self):
+        bucket = TokenBucket(20, burst=5)
+        start = time.time()
+        for i in range(5):
+            bucket.acquire()
+        self.assertLess(time.time() - start, 0.05)
+        for i in range(4):
+            bucket.acquire()
+        self.assertGreater(time.time() - start, 0.15)
+
+    def test_additive_increase(self):
+        c = AdaptiveConcurrency(10, latency=1.0)
+        self.assertEqual(c.limit, 4)
+        for i in range(4):
+            c.acquire()
+            c.release(0.1)
+        self.assertGreater(c.limit, 4.8)
+        for i in range(100):
+            c.acquire()
+            c.release(0.1)
+        self.assertEqual(c.limit, 10)
+
+    def test_multiplicative_decrease(self):
+        c = AdaptiveConcurrency(10, latency=1.0)
+        c.acquire()
+        c.release(2.0)
+        self.assertEqual(c.limit, 2)
+        # only one decrease per latency period
+        c.acquire()
+        c.release(0.1, overloaded=True)
+        self.assertEqual(c.limit, 2)
+        c.last_decrease = 0
+        c.acquire()
+        c.release(0.1, overloaded=True)
+        self.assertEqual(c.limit, 1)
+
+    def test_client_overloaded(self):
+        concurrency = AdaptiveConcurrency(10)
+        session = mock.Mock()
+        session.delete.side_effect = HttpError(http_status=503)
+        c = APIClient(session=session)
+        c.CONCURRENCY = concurrency
+        with self.assertRaises(HttpError):
+            c.delete(Path("/foo"))
+        self.assertEqual(concurrency.limit, 2)
+        self.assertEqual(concurrency.in_flight, 0)
+
+    @mock.patch('contrail_api_cli.commands.utils.parallel_map')
+    @mock.patch('contrail_api_cli.commands.APIClient.get')
+    def test_default_parallel(self, mock_get, mock_parallel_map):
+        ShellContext.current_path = Path("/")
+        mock_parallel_map.return_value = [1, 2]
+        cmds.count(resource=["foo", "bar"])
+        self.assertEqual(mock_parallel_map.call_args[1]["workers"], 4)
+        # the adaptive concurrency throttles instead of -p
+        with mock.patch.object(APIClient, 'CONCURRENCY',
+                               AdaptiveConcurrency(64)):
+            cmds.count(resource=["foo", "bar"])
+            self.assertEqual(mock_parallel_map.call_args[1]["workers"], 64)
+            cmds.count(resource=["foo", "bar"], parallel=2)
+            self.assertEqual(mock_parallel_map.call_args[1]["workers"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import io
+import types
+import unittest
+try:
+    import mock
+except ImportError:
+    import unittest.mock as mock
+
+import six
+
+import contrail_api_cli.commands as cmds
+from contrail_api_cli import render, prompt
+from contrail_api_cli.utils import Path, ShellContext, ResourceList
+
+
+class TestRender(unittest.TestCase):
+
+    def setUp(self):
+        self.uuids = ["ec1afeaa-8930-43b0-a60a-939f23a50724", "c2588045-d6fb-4f37-9f46-9451f653fb6a"]
+        self.resources = ResourceList(
+            paths=["/foo/ec1afeaa-8930-43b0-a60a-939f23a50724",
+                   "/foo/c2588045-d6fb-4f37-9f46-9451f653fb6a"],
+            uuids=["ec1afeaa-8930-43b0-a60a-939f23a50724",
+                   "c2588045-d6fb-4f37-9f46-9451f653fb6a"],
+            fq_names=["foo:a", "foo:bb"],
+            types=["foo", "foo"])
+
+    def test_cached_formatter(self):
+        self.assertIs(render.get_lexer('json'), render.get_lexer('json'))
+        self.assertIs(render.get_formatter(), render.get_formatter())
+
+    def test_no_color(self):
+        self.assertFalse(render.use_color(io.StringIO()))
+        data = {"href": Path("/foo"), "name": "bar"}
+        self.assertEqual(render.render(data, "json", color=False),
+                         '{\n  "href": "/foo",\n  "name": "bar"\n}')
+        self.assertNotEqual(render.render(data, "json", color=True),
+                            render.render(data, "json", color=False))
+        self.assertEqual(render.render(data, "raw"),
+                         '{"href":"/foo","name":"bar"}')
+
+    def test_table(self):
+        lines = render.render_resources(self.resources, Path("/foo"), "table")
+        self.assertIsInstance(lines, types.GeneratorType)
+        self.assertEqual(list(lines), [
+            "path                                  uuid                                  fq_name  type",
+            "ec1afeaa-8930-43b0-a60a-939f23a50724  ec1afeaa-8930-43b0-a60a-939f23a50724  foo:a    foo",
+            "c2588045-d6fb-4f37-9f46-9451f653fb6a  c2588045-d6fb-4f37-9f46-9451f653fb6a  foo:bb   foo",
+        ])
+        lines = render.render({"fq_name": "foo:a",
+                               "bar_refs": [{"to": "bar:b", "href": Path("/bar/b")}]},
+                              "table")
+        self.assertEqual(list(lines), [
+            "attr      value",
+            "bar_refs  bar:b",
+            "fq_name   foo:a",
+        ])
+
+    @unittest.skipIf(render.yaml is None, "PyYAML is not installed")
+    def test_yaml(self):
+        self.assertEqual(render.render({"href": Path("/foo")}, "yaml", color=False),
+                         "href: /foo\n")
+
+    @mock.patch('contrail_api_cli.render.yaml', None)
+    @mock.patch('contrail_api_cli.commands.APIClient.list')
+    def test_ls_yaml_missing(self, mock_list):
+        ShellContext.current_path = Path("/foo")
+        mock_list.return_value = self.resources
+        with self.assertRaises(cmds.CommandError):
+            cmds.ls(output_format="yaml")
+
+    def test_ndjson(self):
+        lines = list(render.render_resources(self.resources, Path("/"), "ndjson"))
+        self.assertEqual(lines[1], '{"fq_name":"foo:bb","path":"foo/c2588045-d6fb-4f37-9f46-9451f653fb6a",'
+                                   '"type":"foo","uuid":"c2588045-d6fb-4f37-9f46-9451f653fb6a"}')
+
+    @mock.patch('contrail_api_cli.commands.APIClient.list')
+    def test_ls_format(self, mock_list):
+        ShellContext.current_path = Path("/foo")
+        mock_list.return_value = self.resources
+        result = cmds.ls(output_format="raw")
+        self.assertEqual(result, "ec1afeaa-8930-43b0-a60a-939f23a50724\n"
+                                 "c2588045-d6fb-4f37-9f46-9451f653fb6a")
+        result = cmds.ls(output_format="ndjson")
+        self.assertEqual(len(list(result)), 2)
+
+    @mock.patch('contrail_api_cli.commands.APIClient.list')
+    def test_ls_ndjson_resource(self, mock_list):
+        ShellContext.current_path = Path("/foo")
+        mock_list.side_effect = lambda path: {"uuid": path.name}
+        self.assertIsInstance(render.render({}, "ndjson"), types.GeneratorType)
+        with mock.patch('sys.stdout', new_callable=six.StringIO) as stdout:
+            prompt.print_result(lambda: cmds.ls(resource=[self.uuids[0]],
+                                                output_format="ndjson"))
+        self.assertEqual(stdout.getvalue(), '{"uuid":"%s"}\n' % self.uuids[0])
+        result = cmds.ls(resource=self.uuids, output_format="ndjson")
+        self.assertEqual(result, '{"uuid":"%s"}\n{"uuid":"%s"}' % tuple(self.uuids))
+
+
+if __name__ == "__main__":
+    unittest.main()
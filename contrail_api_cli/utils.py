@@ -1,12 +1,16 @@
 import os.path
 import json
+import gzip
 from uuid import UUID
+from collections import deque
+from itertools import islice
 try:
     from Queue import Queue
 except ImportError:
     from queue import Queue
-from threading import Thread
+from threading import Thread, Lock
 from pathlib import PurePosixPath
+from concurrent.futures import ThreadPoolExecutor
 
 from prompt_toolkit import prompt
 from prompt_toolkit.completion import Completer, Completion
@@ -17,7 +21,7 @@ class PathEncoder(json.JSONEncoder):
     def default(self, obj):
         if isinstance(obj, Path):
             return str(obj)
-        return super(self, PathEncoder).default(obj)
+        return super(PathEncoder, self).default(obj)
 
 
 class FullPathEncoder(json.JSONEncoder):
@@ -25,7 +29,7 @@ class FullPathEncoder(json.JSONEncoder):
     def default(self, obj):
         if isinstance(obj, Path):
             return obj.url
-        return super(self, FullPathEncoder).default(obj)
+        return super(FullPathEncoder, self).default(obj)
 
 
 class PathCompletionFiller(Thread):
@@ -38,8 +42,11 @@ class PathCompletionFiller(Thread):
     def run(self):
         while True:
             p = ShellContext.completion_queue.get()
-            if p not in self.completer.paths:
-                self.completer.paths.append(p)
+            with self.completer.lock:
+                if isinstance(p, ResourceList):
+                    self.completer.paths.update(p)
+                else:
+                    self.completer.paths.add(p)
             ShellContext.completion_queue.task_done()
 
 
@@ -55,7 +62,9 @@ class PathCompleter(Completer):
                          middle of the path.
     """
     def __init__(self, ignore_case=False, WORD=True, match_middle=True):
-        self.paths = []
+        self.paths = set()
+        # paths is filled by PathCompletionFiller thread
+        self.lock = Lock()
         self.ignore_case = ignore_case
         self.WORD = WORD
         self.match_middle = match_middle
@@ -80,7 +89,9 @@ class PathCompleter(Completer):
                 return "_"
             return path.resource_name
 
-        for p in sorted(self.paths, key=path_sort):
+        with self.lock:
+            paths = list(self.paths)
+        for p in sorted(paths, key=path_sort):
             rel_path = p.relative_to(ShellContext.current_path)
             if not rel_path:
                 continue
@@ -104,6 +115,10 @@ class Path(PurePosixPath):
     def __init__(self, *args):
         self.meta = {}
 
+    def __reduce__(self):
+        # keep meta when pickled
+        return (_make_path, (str(self), self.meta))
+
     @property
     def resource_name(self):
         try:
@@ -134,6 +149,75 @@ class Path(PurePosixPath):
             return self
 
 
+def _make_path(path, meta):
+    p = Path(path)
+    p.meta = meta
+    return p
+
+
+class ResourceList(object):
+    """
+    Result of a listing stored as columns of strings.
+
+    Path objects are only created when iterating over the list,
+    relative_to() renders all paths at once without them.
+
+    :param paths: List of absolute paths as strings.
+    :param uuids: List of uuids.
+    :param fq_names: List of fq_names joined with ':'.
+    :param types: List of resource types.
+    """
+    def __init__(self, paths=None, uuids=None, fq_names=None, types=None):
+        self.paths = paths or []
+        self.uuids = uuids or [None] * len(self.paths)
+        self.fq_names = fq_names or [''] * len(self.paths)
+        self.types = types or [None] * len(self.paths)
+
+    def extend(self, other):
+        self.paths.extend(other.paths)
+        self.uuids.extend(other.uuids)
+        self.fq_names.extend(other.fq_names)
+        self.types.extend(other.types)
+
+    def _make_path(self, idx):
+        p = Path(self.paths[idx])
+        p.meta["fq_name"] = self.fq_names[idx]
+        return p
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __getitem__(self, idx):
+        return self._make_path(idx)
+
+    def __iter__(self):
+        for idx in range(len(self.paths)):
+            yield self._make_path(idx)
+
+    def __eq__(self, other):
+        if isinstance(other, ResourceList):
+            return self.paths == other.paths
+        return list(self) == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return "ResourceList(%r)" % self.paths
+
+    def relative_to(self, path):
+        """
+        Return all paths relative to path as strings
+
+        @type path: Path
+        @rtype: [str]
+        """
+        prefix = str(path).rstrip("/") + "/"
+        start = len(prefix)
+        return [p[start:] if p.startswith(prefix) else p
+                for p in self.paths]
+
+
 class ShellContext(object):
     current_path = Path("/")
     completion_queue = Queue()
@@ -179,15 +263,128 @@ def from_json(resource_json):
     return json.loads(resource_json, object_hook=decode_paths)
 
 
-def decode_paths(obj):
-    from contrail_api_cli.client import APIClient
+def decode_paths(obj, base_url=None):
+    if base_url is None:
+        from contrail_api_cli.client import APIClient
+        base_url = APIClient.base_url
     for attr, value in obj.items():
         if attr in ('href', 'parent_href'):
-            obj[attr] = Path(value[len(APIClient.base_url):])
+            obj[attr] = Path(value[len(base_url):])
             obj[attr].meta["fq_name"] = ":".join(obj.get('to', obj.get('fq_name', '')))
     return obj
 
 
+def get_cache_dir(name):
+    """
+    Return the directory where name is cached
+    """
+    cache_home = os.environ.get('XDG_CACHE_HOME',
+                                os.path.expanduser('~/.cache'))
+    return os.path.join(cache_home, 'contrail-api-cli', name)
+
+
+def open_file(path, mode="rb", compress=False):
+    """
+    Open path with gzip if compress is True or if path
+    ends with .gz
+    """
+    if compress or path.endswith(".gz"):
+        return gzip.open(path, mode)
+    return open(path, mode)
+
+
+class Journal(object):
+    """
+    Append only file recording a plan and its completed steps,
+    so that an interrupted plan can be resumed.
+
+    :param filename: Journal file.
+    """
+    def __init__(self, filename):
+        self.filename = filename
+
+    def start(self, plan):
+        """
+        Record a new plan, forgetting any previous one
+
+        @type plan: [str]
+        """
+        directory = os.path.dirname(self.filename)
+        if not os.path.isdir(directory):
+            os.makedirs(directory, 0o700)
+        with open(self.filename, 'w') as f:
+            f.write(json.dumps({'plan': plan}) + "\n")
+
+    def done(self, step):
+        """
+        Record that step is completed
+        """
+        with open(self.filename, 'a') as f:
+            f.write(json.dumps({'done': step}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def load(self):
+        """
+        Return the plan and the set of completed steps, or
+        None if there is no journal
+
+        @rtype: ([str], set)
+        """
+        try:
+            with open(self.filename) as f:
+                plan = json.loads(f.readline())['plan']
+                done = set()
+                for line in f:
+                    try:
+                        done.add(json.loads(line)['done'])
+                    except ValueError:
+                        # last line may be incomplete
+                        break
+        except (IOError, OSError, ValueError, KeyError):
+            return None
+        return plan, done
+
+    def remove(self):
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+
+
+def chunks(iterable, size):
+    """
+    Split iterable in lists of size items
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def parallel_map(func, iterable, workers=10):
+    """
+    Like map() but func is called concurrently by a pool of workers.
+
+    Results are yielded in order. At most 2 * workers items are pending
+    at any time so that iterable is consumed lazily and memory usage
+    doesn't depend on its size.
+    """
+    pool = ThreadPoolExecutor(max_workers=workers)
+    pending = deque()
+    try:
+        for item in iterable:
+            pending.append(pool.submit(func, item))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+        pool.shutdown(wait=False)
+
+
 def all_subclasses(cls):
     return cls.__subclasses__() + [g for s in cls.__subclasses__()
                                    for g in all_subclasses(s)]
@@ -1,11 +1,17 @@
+import sys
+
 from setuptools import setup, find_packages
 
 install_requires = [
     'prompt_toolkit',
     'pathlib',
-    'python-keystoneclient'
+    'python-keystoneclient',
+    'six'
 ]
 
+if sys.version_info < (3, 2):
+    install_requires.append('futures')
+
 test_requires = [
     'mock'
 ]
@@ -23,6 +29,9 @@ setup(
     packages=find_packages(),
     include_package_data=True,
     install_requires=install_requires,
+    extras_require={
+        'yaml': ['PyYAML']
+    },
     scripts=[],
     license="MIT",
     entry_points={